@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.HashingBusyMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +57,20 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'app.urls'
 
+# Per view latency and SQL metrics (core.middleware), served at /metrics.
+# Set METRICS_TOKEN to require `Authorization: Bearer <token>` to scrape;
+# without it only staff users and INTERNAL_IPS (comma separated
+# METRICS_INTERNAL_IPS) may read the metrics.
+METRICS = {
+    'SERVER_TIMING': os.environ.get(
+        'METRICS_SERVER_TIMING', str(DEBUG)
+    ).lower() in ('1', 'true'),
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+}
+INTERNAL_IPS = [
+    ip for ip in os.environ.get('METRICS_INTERNAL_IPS', '').split(',') if ip
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -76,13 +92,25 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# Set DB_ENGINE=core.db.backends.postgresql_pool to reuse connections across
+# requests from a per-process pool sized by the POOL options.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.environ.get(
+            'DB_ENGINE', 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'MAX_LIFETIME': float(
+                os.environ.get('DB_POOL_MAX_LIFETIME', 1800)
+            ),
+        },
     }
 }
 
@@ -108,6 +136,25 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing runs on a bounded pool (core.hashing) so login bursts
+# can't pin every request thread. Lower PASSWORD_HASH_ITERATIONS for test
+# and CI runs; production keeps Django's default strength.
+PASSWORD_HASHERS = [
+    'core.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+PASSWORD_HASH_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASH_ITERATIONS', 120000)
+)
+
+PASSWORD_HASHING_POOL = {
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', 4)),
+    'QUEUE_SIZE': int(os.environ.get('PASSWORD_HASHING_QUEUE_SIZE', 16)),
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
@@ -127,3 +174,37 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 AUTH_USER_MODEL = 'core.User'
+
+# Logins match User.email_canonical, so any letter case works.
+AUTHENTICATION_BACKENDS = ['core.backends.CanonicalEmailBackend']
+
+# Stateless HMAC signed access tokens (core.tokens). VERSION_TTL bounds how
+# long a worker trusts its cached token_version after a revocation made by
+# another process.
+SIGNED_TOKEN = {
+    'LIFETIME': int(os.environ.get('SIGNED_TOKEN_LIFETIME', 3600)),
+    'VERSION_TTL': int(os.environ.get('SIGNED_TOKEN_VERSION_TTL', 30)),
+}
+
+# Token -> user resolution cache used by core.authentication.
+# Set CACHE_ALIAS to a shared cache (e.g. memcached/redis) to share entries
+# between workers for TTL seconds. Each worker also keeps entries in memory
+# for LOCAL_TTL seconds, which bounds how long a token deleted or a user
+# deactivated through another process is still accepted.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 300)),
+    'LOCAL_TTL': 5,
+    'CACHE_ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS') or None,
+}
+
+# Rendered list responses from recipe.views, keyed by the user's collection
+# versions. Point CACHE_ALIAS at a shared backend so workers reuse each
+# other's renders; an empty alias disables the cache.
+LIST_RESPONSE_CACHE = {
+    'CACHE_ALIAS': os.environ.get('LIST_RESPONSE_CACHE_ALIAS', 'default'),
+    'TTL': int(os.environ.get('LIST_RESPONSE_CACHE_TTL', 300)),
+}
+
+# Process-local cache of interned tag and ingredient names (core.models.Name)
+NAME_CACHE_SIZE = int(os.environ.get('NAME_CACHE_SIZE', 50000))
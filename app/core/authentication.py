@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core import tokens
+from core.lru import LRUCache
+
+
+DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    'LOCAL_TTL': 5,
+    'CACHE_ALIAS': None,
+    'KEY_PREFIX': 'authtoken:',
+}
+
+
+# Columns authentication never needs; the password hash in particular
+# must not be copied into a shared cache. They are deferred on rebuilt
+# users and load from the database if accessed.
+UNCACHED_FIELDS = ('password',)
+
+# Left in place of an invalidated entry for LOCAL_TTL seconds so a
+# request that read the row before the change can't write it back.
+REVOKED = ''
+
+
+def user_state(user):
+    """Return the picklable column values authentication needs"""
+    field_names = tuple(
+        f.attname for f in user._meta.concrete_fields
+        if f.attname not in UNCACHED_FIELDS
+    )
+    return (field_names, tuple(getattr(user, f) for f in field_names))
+
+
+def user_from_state(state):
+    """Rebuild a user from user_state() for a single request
+
+    Cached values may be stale, so they are not recorded as the saved
+    state. Views that modify the user should load it from the database
+    instead, as user.views.ManageUserView does for updates.
+    """
+    field_names, values = state
+    user = get_user_model().from_db(DEFAULT_DB_ALIAS, field_names, values)
+    del user._saved_values
+    return user
+
+
+class TokenUserCache:
+    """Resolves token keys to users without touching the database
+
+    Entries live in a bounded in-process LRU and, when CACHE_ALIAS is set,
+    in a shared Django cache. Users are stored as raw column values and
+    rebuilt per lookup so requests never share a model instance.
+
+    Invalidation only reaches this worker's LRU and the shared cache, so
+    other workers keep serving a revoked token or deactivated user for up
+    to LOCAL_TTL seconds whether or not a shared cache is configured. It
+    also marks the token and user as revoked for LOCAL_TTL seconds, during
+    which set_user() stores nothing for them; shared entries are only
+    added, never overwritten.
+    """
+
+    def __init__(self, options=None):
+        self.options = dict(DEFAULTS, **(options or {}))
+        local_ttl = self.options['LOCAL_TTL']
+        self.local = LRUCache(self.options['MAX_SIZE'], ttl=local_ttl)
+        self.local_keys = LRUCache(self.options['MAX_SIZE'], ttl=local_ttl)
+        self.revoked = LRUCache(self.options['MAX_SIZE'], ttl=local_ttl)
+        self.users = LRUCache(
+            self.options['MAX_SIZE'],
+            ttl=settings.SIGNED_TOKEN['VERSION_TTL']
+        )
+
+    @property
+    def shared(self):
+        alias = self.options['CACHE_ALIAS']
+        return caches[alias] if alias else None
+
+    def _token_key(self, key):
+        return '%stoken:%s' % (self.options['KEY_PREFIX'], key)
+
+    def _user_key(self, user_pk):
+        return '%suser:%s' % (self.options['KEY_PREFIX'], user_pk)
+
+    def get_user(self, key):
+        """Return a fresh user instance for the token key, or None"""
+        state = self.local.get(key)
+        if state is None and self.shared is not None:
+            state = self.shared.get(self._token_key(key))
+            if state:
+                self._store_local(key, state)
+        if not state:
+            return None
+        return user_from_state(state)
+
+    def set_user(self, key, user):
+        """Cache the user for key unless either was just invalidated"""
+        if self.revoked.get(('token', key)) or \
+                self.revoked.get(('user', user.pk)):
+            return
+        state = user_state(user)
+        shared = self.shared
+        if shared is not None:
+            ttl = self.options['TTL']
+            user_key = self._user_key(user.pk)
+            if not shared.add(user_key, key, ttl) and \
+                    shared.get(user_key) != key:
+                return
+            if not shared.add(self._token_key(key), state, ttl) and \
+                    shared.get(self._token_key(key)) == REVOKED:
+                return
+        self._store_local(key, state)
+
+    def _store_local(self, key, state):
+        self.local.set(key, state)
+        pk_name = get_user_model()._meta.pk.attname
+        user_pk = state[1][state[0].index(pk_name)]
+        self.local_keys.set(user_pk, key)
+
+    def invalidate_key(self, key):
+        self.local.delete(key)
+        self.revoked.set(('token', key), True)
+        if self.shared is not None:
+            self.shared.set(
+                self._token_key(key), REVOKED, self.options['LOCAL_TTL']
+            )
+
+    def get_user_by_pk(self, user_pk):
+        """Return a fresh user instance by primary key, caching per worker"""
+        state = self.users.get(user_pk)
+        if state is None:
+            user = get_user_model()._default_manager.filter(pk=user_pk).first()
+            if user is None:
+                return None
+            if not self.revoked.get(('user', user_pk)):
+                self.users.set(user_pk, user_state(user))
+            return user
+        return user_from_state(state)
+
+    def invalidate_user(self, user_pk):
+        self.users.delete(user_pk)
+        self.revoked.set(('user', user_pk), True)
+        key = self.local_keys.get(user_pk)
+        self.local_keys.delete(user_pk)
+        if self.shared is not None:
+            shared_key = self.shared.get(self._user_key(user_pk))
+            self.shared.set(
+                self._user_key(user_pk), REVOKED, self.options['LOCAL_TTL']
+            )
+            if shared_key:
+                self.invalidate_key(shared_key)
+        if key:
+            self.invalidate_key(key)
+
+    def clear(self):
+        self.users.clear()
+        self.local.clear()
+        self.local_keys.clear()
+        self.revoked.clear()
+
+
+token_cache = TokenUserCache(getattr(settings, 'TOKEN_AUTH_CACHE', None))
+
+
+def invalidate_user(user_pk):
+    """Drop cached tokens for a user now and again once the change commits"""
+    token_cache.invalidate_user(user_pk)
+    transaction.on_commit(lambda: token_cache.invalidate_user(user_pk))
+
+
+def invalidate_token(key):
+    token_cache.invalidate_key(key)
+    transaction.on_commit(lambda: token_cache.invalidate_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user resolution"""
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get_user(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set_user(key, user)
+            return (user, token)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return (user, Token(key=key, user=user))
+
+
+class SignedTokenAuthentication(CachedTokenAuthentication):
+    """Accepts signed tokens verified in memory next to opaque DB tokens
+
+    A signed token is only valid while the user's token_version matches the
+    one it was issued with; the version is read from a per worker cache that
+    expires after SIGNED_TOKEN['VERSION_TTL'] seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        if not tokens.is_signed_token(key):
+            return super().authenticate_credentials(key)
+
+        try:
+            user_id, version = tokens.read_signed_token(key)
+        except tokens.BadSignedToken:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user = token_cache.get_user_by_pk(user_id)
+        if user is None or user.token_version != version:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return (user, key)
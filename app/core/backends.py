@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from core.models import canonical_email
+
+
+class CanonicalEmailBackend(ModelBackend):
+    """Log users in by email in any letter case
+
+    The login is case-folded and looked up through the unique index on
+    User.email_canonical, so it stays a single index seek where an
+    `email__iexact` filter would scan the table.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get(
+                email_canonical=canonical_email(username)
+            )
+        except UserModel.DoesNotExist:
+            # Run the hasher once anyway, as ModelBackend does, so unknown
+            # emails take as long as wrong passwords.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and \
+                self.user_can_authenticate(user):
+            return user
+        return None
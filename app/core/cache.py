@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 300,
+    'LOCK_TTL': 10,
+    'WAIT': 2.0,
+    'POLL_INTERVAL': 0.02,
+    'KEY_PREFIX': 'listcache:',
+}
+
+
+class ResponseCache:
+    """Shares rendered response bodies between workers
+
+    Entries are immutable: callers build keys from everything the body
+    depends on, including the data's version, so a write makes the old
+    key unreachable instead of deleting it and stale entries simply age
+    out. On a miss only one caller renders while the others poll for its
+    result (single-flight), which stops a popular list that was just
+    invalidated from being rebuilt by every worker at once. A caller that
+    waits longer than WAIT renders for itself without storing.
+    """
+
+    def __init__(self, options=None):
+        self.options = dict(DEFAULTS, **(options or {}))
+
+    @property
+    def cache(self):
+        alias = self.options['CACHE_ALIAS']
+        return caches[alias] if alias else None
+
+    def get_or_render(self, key, render):
+        """Return the cached entry for key, calling render() on a miss"""
+        cache = self.cache
+        if cache is None:
+            return render()
+        key = self.options['KEY_PREFIX'] + key
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+        lock = key + ':lock'
+        if cache.add(lock, 1, self.options['LOCK_TTL']):
+            try:
+                entry = render()
+                cache.set(key, entry, self.options['TTL'])
+            finally:
+                cache.delete(lock)
+            return entry
+
+        deadline = time.monotonic() + self.options['WAIT']
+        while time.monotonic() < deadline:
+            time.sleep(self.options['POLL_INTERVAL'])
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        return render()
+
+
+list_cache = ResponseCache(getattr(settings, 'LIST_RESPONSE_CACHE', None))
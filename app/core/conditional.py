@@ -0,0 +1,36 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Strong ETag over everything that determines a representation"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return '"%s"' % digest
+
+
+def timestamp(value):
+    """Whole seconds since the epoch for a Last-Modified header, or None"""
+    return None if value is None else int(value.timestamp())
+
+
+def set_validators(response, etag, last_modified=None):
+    """Add the ETag and Last-Modified headers to a response"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """Return a 304 (or 412) response if the request's conditions say so
+
+    Returns None when the full response should be sent.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
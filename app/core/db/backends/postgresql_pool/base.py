@@ -0,0 +1,122 @@
+import threading
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation
+from psycopg2 import extensions
+
+from core.db.pool import ConnectionPool
+
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 5.0,
+    'MAX_LIFETIME': 1800.0,
+    'CHECK_IDLE_AFTER': 30.0,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def check_connection(conn):
+    """Ping a pooled psycopg2 connection before handing it out again"""
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except base.Database.Error:
+        return False
+
+
+def reset_connection(conn):
+    """Roll back anything left open so the next checkout starts clean"""
+    if conn.closed:
+        raise base.Database.InterfaceError('connection already closed')
+    if conn.get_transaction_status() != \
+            extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+
+
+def get_pool(alias, conn_params, options):
+    key = (alias, tuple(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = dict(POOL_DEFAULTS, **options)
+            pool = _pools[key] = ConnectionPool(
+                lambda: base.Database.connect(**conn_params),
+                min_size=options['MIN_SIZE'],
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT'],
+                max_lifetime=options['MAX_LIFETIME'],
+                check_idle_after=options['CHECK_IDLE_AFTER'],
+                check=check_connection,
+                reset=reset_connection,
+            )
+        return pool
+
+
+def pool_stats():
+    """Return statistics of every pool in this process, keyed by alias"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    stats = {}
+    for (alias, params), pool in pools:
+        label = '%s:%s' % (alias, dict(params).get('database'))
+        stats[label] = pool.stats()
+    return stats
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
+
+
+class PooledDatabaseCreation(DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep DROP DATABASE from running.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend reusing connections from a per-process pool
+
+    Configure it with a POOL dict next to the usual DATABASES keys, e.g.
+    `'POOL': {'MAX_SIZE': 20}`. Leave CONN_MAX_AGE at 0: Django then
+    "closes" the connection at the end of every request, which hands it
+    back to the pool instead of dropping the TCP session.
+    """
+    creation_class = PooledDatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(
+            self.alias, conn_params, self.settings_dict.get('POOL', {})
+        )
+        connection = self.pool.getconn()
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(
+                    self.connection,
+                    close=self.errors_occurred and not self.is_usable()
+                )
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+
+from psycopg2.pool import PoolError
+
+
+class ConnectionPool:
+    """A blocking, thread safe connection pool with health and age checks
+
+    Mirrors the getconn/putconn/closeall interface of psycopg2's pool
+    classes, adding what they lack: checkout waits (up to `timeout`) for a
+    free connection instead of failing at once, idle connections are
+    pinged with `check` before reuse, connections older than
+    `max_lifetime` are retired, and wait/usage statistics are kept.
+
+    The DB-API specifics are injected, so the pool can be driven by a stub
+    connection factory in tests.
+    """
+
+    def __init__(self, factory, min_size=0, max_size=10, timeout=5.0,
+                 max_lifetime=1800.0, check_idle_after=30.0,
+                 check=None, reset=None, close=None, clock=time.monotonic):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('Invalid pool size %d..%d' % (min_size, max_size))
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle_after = check_idle_after
+        self.check = check or (lambda conn: True)
+        self.reset = reset or (lambda conn: None)
+        self.close = close or (lambda conn: conn.close())
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._born = {}
+        self._in_use = 0
+        self._opening = 0
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), self.clock()))
+
+    @property
+    def size(self):
+        return len(self._born)
+
+    def _connect(self):
+        conn = self.factory()
+        self._born[id(conn)] = self.clock()
+        self._stats['created'] += 1
+        return conn
+
+    def _expired(self, conn, now):
+        return now - self._born[id(conn)] >= self.max_lifetime
+
+    def _discard(self, conn):
+        self._born.pop(id(conn), None)
+        self._stats['discarded'] += 1
+        try:
+            self.close(conn)
+        except Exception:
+            pass
+
+    def getconn(self):
+        """Check out a healthy connection, waiting up to `timeout`"""
+        started = self.clock()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError('connection pool is closed')
+                now = self.clock()
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    if self._expired(conn, now) or (
+                        now - idle_since >= self.check_idle_after and
+                        not self.check(conn)
+                    ):
+                        self._discard(conn)
+                        continue
+                    break
+                if self.size + self._opening < self.max_size:
+                    # Connect without holding the lock; the reserved slot
+                    # keeps concurrent callers from exceeding max_size.
+                    self._opening += 1
+                    self._cond.release()
+                    try:
+                        conn = self.factory()
+                    finally:
+                        self._cond.acquire()
+                        self._opening -= 1
+                        self._cond.notify()
+                    self._born[id(conn)] = self.clock()
+                    self._stats['created'] += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolError(
+                        'connection pool exhausted (max_size=%d)'
+                        % self.max_size
+                    )
+                self._cond.wait(remaining)
+
+            waited = self.clock() - started
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(
+                self._stats['max_wait_seconds'], waited
+            )
+            return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection, discarding it if broken or too old"""
+        if not close:
+            try:
+                self.reset(conn)
+            except Exception:
+                close = True
+        with self._cond:
+            self._in_use -= 1
+            if id(conn) not in self._born:
+                pass
+            elif close or self._closed or self._expired(conn, self.clock()):
+                self._discard(conn)
+            else:
+                self._idle.append((conn, self.clock()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                size=self.size,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                max_size=self.max_size,
+            )
@@ -0,0 +1,78 @@
+import json
+import zlib
+
+from core.models import Tag, Ingredient
+
+
+KINDS = (
+    ('tag', Tag),
+    ('ingredient', Ingredient),
+)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def parse_resume_token(value):
+    """Parse a `<kind>:<last id>` resume token into a tuple"""
+    kind, _, last_id = value.partition(':')
+    if kind not in dict(KINDS):
+        raise ValueError('Unknown kind %r' % kind)
+    return kind, int(last_id)
+
+
+def iter_records(user, after=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the user's tags then ingredients as NDJSON encoded lines
+
+    Rows are read in id order through QuerySet.iterator(), which uses a
+    server-side cursor on PostgreSQL, so memory stays flat. `after` is a
+    (kind, id) pair from parse_resume_token() to continue an interrupted
+    export; its kind is resumed past id and every earlier kind is skipped.
+    """
+    skipping = after is not None
+    for kind, model in KINDS:
+        last_id = 0
+        if skipping:
+            if kind != after[0]:
+                continue
+            skipping = False
+            last_id = after[1]
+
+        rows = model.objects.filter(
+            user=user, id__gt=last_id
+        ).order_by('id').values_list('id', 'name')
+        for pk, name in rows.iterator(chunk_size=chunk_size):
+            yield json.dumps(
+                {'type': kind, 'id': pk, 'name': name},
+                ensure_ascii=False, separators=(',', ':')
+            ).encode('utf-8') + b'\n'
+
+
+def buffered(chunks, size=64 * 1024):
+    """Coalesce small byte chunks into writes of roughly `size` bytes"""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks, level=6):
+    """Compress a stream of byte chunks into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(user, after=None, compress=False,
+                  chunk_size=DEFAULT_CHUNK_SIZE):
+    stream = buffered(iter_records(user, after, chunk_size))
+    return gzipped(stream) if compress else stream
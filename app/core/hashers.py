@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from core.hashing import get_executor
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 hasher that runs on the bounded hashing executor
+
+    Both set_password() and check_password() go through encode(), so user
+    creation and login share the same concurrency limit; a full pool
+    raises core.hashing.HashingBusy, a plain exception that callers
+    outside a request must handle themselves. The iteration
+    count comes from settings.PASSWORD_HASH_ITERATIONS.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        return get_executor().run(super().encode, password, salt, iterations)
@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing queue is full
+
+    core.middleware.HashingBusyMiddleware turns it into a 503 response.
+    """
+
+
+class HashingExecutor:
+    """A bounded thread pool for CPU heavy password hashing
+
+    At most `workers` hashes run at once and `queue_size` more may wait;
+    anything beyond that fails fast with HashingBusy instead of tying up
+    the request thread.
+    """
+
+    def __init__(self, workers=4, queue_size=16):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='hasher'
+        )
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._stats = {
+            'completed': 0,
+            'rejected': 0,
+            'in_flight': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'hash_seconds': 0.0,
+        }
+
+    def run(self, func, *args, **kwargs):
+        """Run func on the pool and block until its result is ready"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingBusy()
+
+        with self._lock:
+            self._stats['in_flight'] += 1
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record(started - submitted,
+                             time.perf_counter() - started)
+
+        future = self._pool.submit(task)
+        future.add_done_callback(lambda f: self._slots.release())
+        return future.result()
+
+    def _record(self, wait, duration):
+        with self._lock:
+            stats = self._stats
+            stats['in_flight'] -= 1
+            stats['completed'] += 1
+            stats['wait_seconds'] += wait
+            stats['hash_seconds'] += duration
+            stats['max_wait_seconds'] = max(stats['max_wait_seconds'], wait)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, workers=self.workers,
+                        queue_size=self.queue_size)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process wide executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                options = settings.PASSWORD_HASHING_POOL
+                _executor = HashingExecutor(
+                    workers=options['WORKERS'],
+                    queue_size=options['QUEUE_SIZE'],
+                )
+    return _executor
@@ -0,0 +1,145 @@
+import gc
+import re
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Tag, Ingredient
+from core.renderers import StreamingJSONRenderer
+from recipe.services import TagSerializer, IngredientSerializer
+
+
+MODELS = {
+    'tag': (Tag, TagSerializer),
+    'ingredient': (Ingredient, IngredientSerializer),
+}
+
+
+def proc_status_kb(field):
+    """Read a VmRSS/VmHWM style field from /proc/self/status, in kB"""
+    try:
+        with open('/proc/self/status') as f:
+            match = re.search(r'^%s:\s+(\d+) kB' % field, f.read(), re.M)
+    except OSError:
+        return None
+    return int(match.group(1)) if match else None
+
+
+def reset_peak_rss():
+    """Reset the kernel's RSS high-water mark (Linux 4.0+)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    """Compare list serialization throughput and memory of each list path
+
+    `model` serializes model instances, `values` renders values() rows and
+    `stream` encodes rows from QuerySet.iterator() chunk by chunk, as the
+    `?stream=1` list mode does. With --memory each path's peak RSS growth
+    is measured by resetting the kernel high-water mark before it runs,
+    and its peak Python allocation with tracemalloc. Paths run from the
+    leanest up, because memory the allocator keeps from one path can be
+    reused by the next without showing up as growth.
+
+    Rows are inserted inside a transaction that is rolled back at the end,
+    so the command is safe to run against a development database.
+    """
+    help = 'Benchmark tag/ingredient list serialization speed and memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--model', choices=sorted(MODELS), default='ingredient'
+        )
+        parser.add_argument(
+            '--memory', action='store_true',
+            help='Also report peak RSS and Python allocations per path'
+        )
+
+    def handle(self, *args, **options):
+        model, serializer_class = MODELS[options['model']]
+        fields = serializer_class.Meta.fields
+        renderer = JSONRenderer()
+        streaming = StreamingJSONRenderer()
+
+        def model_path(queryset):
+            data = serializer_class(list(queryset), many=True).data
+            return renderer.render(data)
+
+        def values_path(queryset):
+            return renderer.render(list(queryset.values(*fields)))
+
+        def stream_path(queryset):
+            rows = queryset.values(*fields).iterator(chunk_size=2000)
+            size = 0
+            for chunk in streaming.iter_render(rows):
+                size += len(chunk)
+            return size
+
+        paths = (('stream', stream_path), ('values', values_path),
+                 ('model', model_path))
+
+        with transaction.atomic():
+            user = get_user_model().objects.create(
+                email='bench-list@example.invalid'
+            )
+            model.objects.bulk_create(
+                model(user=user, name='item %07d' % i)
+                for i in range(options['rows'])
+            )
+            queryset = model.objects.filter(user=user).order_by(
+                'sort_name', 'id'
+            )
+
+            expected = model_path(queryset)
+            streamed = b''.join(streaming.iter_render(
+                queryset.values(*fields).iterator()
+            ))
+            if values_path(queryset) != expected or streamed != expected:
+                self.stderr.write('Outputs differ between paths!')
+
+            for label, func in paths:
+                best = min(
+                    self._time(func, queryset)
+                    for _ in range(options['repeat'])
+                )
+                line = '%-7s %10.0f rows/sec  (%.1f ms)' % (
+                    label, options['rows'] / best, best * 1000
+                )
+                if options['memory']:
+                    line += '  %s' % self._memory(func, queryset)
+                self.stdout.write(line)
+
+            transaction.set_rollback(True)
+
+    def _time(self, func, queryset):
+        start = time.perf_counter()
+        func(queryset)
+        return time.perf_counter() - start
+
+    def _memory(self, func, queryset):
+        gc.collect()
+        rss = 'n/a'
+        if reset_peak_rss():
+            before = proc_status_kb('VmRSS')
+            func(queryset)
+            rss = '%.1f MB' % ((proc_status_kb('VmHWM') - before) / 1024.0)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func(queryset)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return 'peak RSS +%s, python peak %.1f MB' % (rss, peak / 1048576.0)
@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+
+MODELS = {
+    'tag': (Tag, 'recipe:tag-list'),
+    'ingredient': (Ingredient, 'recipe:ingredient-list'),
+}
+
+QUERIES = (
+    ('name', {'name': 'ITEM 0000042'}),
+    ('prefix', {'search': 'item 00000', 'match': 'prefix'}),
+    ('substring', {'search': '0042'}),
+)
+
+
+class Command(BaseCommand):
+    """Measure name search latency as one user's row count grows
+
+    For each size a user is given that many rows and every query type is
+    timed end to end through the list endpoint. All rows are created in a
+    transaction that is rolled back afterwards.
+    """
+    help = 'Benchmark ?name= and ?search= latency across dataset sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,10000,100000',
+            help='Comma separated per-user row counts'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--model', choices=sorted(MODELS), default='ingredient'
+        )
+
+    def handle(self, *args, **options):
+        model, url_name = MODELS[options['model']]
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        url = reverse(url_name)
+
+        self.stdout.write('%10s' % 'rows' + ''.join(
+            '%14s' % ('%s ms' % label) for label, _ in QUERIES
+        ))
+        with override_settings(ALLOWED_HOSTS=['*']), transaction.atomic():
+            user = get_user_model().objects.create(
+                email='bench-search@example.invalid'
+            )
+            client = APIClient()
+            client.force_authenticate(user)
+            created = 0
+            for size in sizes:
+                model.objects.bulk_create(
+                    model(user=user, name='item %07d' % i)
+                    for i in range(created, size)
+                )
+                created = max(created, size)
+
+                timings = []
+                for _, params in QUERIES:
+                    samples = []
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        client.get(url, params)
+                        samples.append(time.perf_counter() - started)
+                    timings.append(statistics.median(samples) * 1000)
+                self.stdout.write('%10d' % size + ''.join(
+                    '%14.2f' % timing for timing in timings
+                ))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,270 @@
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.metrics import QueryRecorder
+from core.models import Tag, Ingredient
+
+
+EMAIL_DOMAIN = '@bench.invalid'
+PASSWORD = 'bench-password'
+
+
+def user_create(client, ctx, i):
+    return client.post(reverse('user:create'), {
+        'email': 'new-%d-%d%s' % (ctx['run'], i, EMAIL_DOMAIN),
+        'name': 'bench',
+        'password': PASSWORD,
+    })
+
+
+def token_obtain(client, ctx, i):
+    return client.post(reverse('user:token'), {
+        'email': ctx['email'], 'password': PASSWORD,
+    })
+
+
+def me_retrieve(client, ctx, i):
+    return client.get(reverse('user:me'))
+
+
+def me_patch(client, ctx, i):
+    return client.patch(reverse('user:me'), {'name': 'bench %d' % i})
+
+
+def tag_list(client, ctx, i):
+    return client.get(reverse('recipe:tag-list'))
+
+
+def tag_create(client, ctx, i):
+    return client.post(reverse('recipe:tag-list'), {
+        'name': 'new tag %d-%d' % (ctx['run'], i)
+    })
+
+
+def ingredient_list(client, ctx, i):
+    return client.get(reverse('recipe:ingredient-list'))
+
+
+def ingredient_create(client, ctx, i):
+    return client.post(reverse('recipe:ingredient-list'), {
+        'name': 'new ingredient %d-%d' % (ctx['run'], i)
+    })
+
+
+SCENARIOS = (
+    ('user_create', user_create),
+    ('token_obtain', token_obtain),
+    ('me_retrieve', me_retrieve),
+    ('me_patch', me_patch),
+    ('tag_list', tag_list),
+    ('tag_create', tag_create),
+    ('ingredient_list', ingredient_list),
+    ('ingredient_create', ingredient_create),
+)
+
+# Queries per request are deterministic, so they get a fixed slack rather
+# than the relative --threshold applied to latency and throughput.
+QUERY_SLACK = 0.5
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    rank = max(int(math.ceil(pct / 100.0 * len(samples))) - 1, 0)
+    return samples[rank]
+
+
+class Command(BaseCommand):
+    """Drive the real URL routes in-process and report performance
+
+    A throw-away dataset of --users users (each with --rows tags and
+    ingredients) is created under the bench.invalid domain and removed
+    afterwards. With --concurrency above 1 requests run on worker threads,
+    each with its own database connection, so the database must be a real
+    server rather than an in-memory SQLite.
+    """
+    help = 'Benchmark the API and compare against a stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--rows', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            choices=[name for name, _ in SCENARIOS],
+            help='Run only this scenario, may be repeated'
+        )
+        parser.add_argument('--baseline', help='Baseline JSON to compare')
+        parser.add_argument(
+            '--save-baseline', help='Write the results to this JSON file'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Allowed relative regression of p95 and throughput'
+        )
+        parser.add_argument(
+            '--keep', action='store_true', help='Keep the benchmark data'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        wanted = options['scenarios']
+        scenarios = [s for s in SCENARIOS if not wanted or s[0] in wanted]
+
+        users = self.create_dataset(options['users'], options['rows'])
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                results = {
+                    name: self.run_scenario(func, users)
+                    for name, func in scenarios
+                }
+        finally:
+            if not options['keep']:
+                self.delete_dataset()
+
+        self.report(results)
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump({
+                    'options': {k: options[k] for k in
+                                ('users', 'rows', 'requests', 'concurrency')},
+                    'results': results,
+                }, f, indent=2, sort_keys=True)
+        if options['baseline']:
+            self.compare(results, options['baseline'])
+
+    def create_dataset(self, count, rows):
+        self.delete_dataset()
+        password = make_password(PASSWORD)
+        get_user_model().objects.bulk_create(
+            get_user_model()(email='bench-%d%s' % (i, EMAIL_DOMAIN),
+                             name='bench', password=password)
+            for i in range(count)
+        )
+        users = list(get_user_model().objects.filter(
+            email__endswith=EMAIL_DOMAIN
+        ).order_by('id'))
+        Token.objects.bulk_create(
+            Token(user=user, key=Token().generate_key()) for user in users
+        )
+        for model in (Tag, Ingredient):
+            model.objects.bulk_create(
+                model(user=user, name='%s %d' % (model.__name__, n))
+                for user in users for n in range(rows)
+            )
+        tokens = dict(Token.objects.filter(
+            user__in=users
+        ).values_list('user_id', 'key'))
+        return [(user.email, tokens[user.pk]) for user in users]
+
+    def delete_dataset(self):
+        get_user_model().objects.filter(
+            email__endswith=EMAIL_DOMAIN
+        ).delete()
+
+    def run_scenario(self, func, users):
+        run = int(time.time() * 1000)
+        total = self.options['requests']
+        concurrency = max(1, self.options['concurrency'])
+
+        def worker(index):
+            email, key = users[index % len(users)]
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+            ctx = {'run': run, 'email': email}
+            samples = []
+            try:
+                for i in range(index, total, concurrency):
+                    recorder = QueryRecorder()
+                    started = time.perf_counter()
+                    with connection.execute_wrapper(recorder):
+                        res = func(client, ctx, i)
+                    samples.append((
+                        time.perf_counter() - started,
+                        recorder.count,
+                        res.status_code >= 400,
+                    ))
+            finally:
+                if concurrency > 1:
+                    connections.close_all()
+            return samples
+
+        started = time.perf_counter()
+        if concurrency == 1:
+            samples = worker(0)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                samples = [s for chunk in pool.map(worker, range(concurrency))
+                           for s in chunk]
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(s[0] * 1000 for s in samples)
+        return {
+            'requests': len(samples),
+            'errors': sum(s[2] for s in samples),
+            'throughput': len(samples) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'queries_per_request': (
+                sum(s[1] for s in samples) / len(samples) if samples else 0.0
+            ),
+        }
+
+    def report(self, results):
+        self.stdout.write('%-18s %8s %6s %10s %9s %9s %9s %8s' % (
+            'scenario', 'requests', 'errors', 'req/s',
+            'p50 ms', 'p95 ms', 'p99 ms', 'queries'
+        ))
+        for name, r in results.items():
+            self.stdout.write(
+                '%-18s %8d %6d %10.1f %9.2f %9.2f %9.2f %8.2f' % (
+                    name, r['requests'], r['errors'], r['throughput'],
+                    r['p50_ms'], r['p95_ms'], r['p99_ms'],
+                    r['queries_per_request'],
+                )
+            )
+
+    def compare(self, results, path):
+        with open(path) as f:
+            baseline = json.load(f)['results']
+
+        threshold = self.options['threshold']
+        failures = []
+        for name, current in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if current['p95_ms'] > base['p95_ms'] * (1 + threshold):
+                failures.append('%s p95 %.2fms > baseline %.2fms' % (
+                    name, current['p95_ms'], base['p95_ms']))
+            if current['throughput'] < base['throughput'] * (1 - threshold):
+                failures.append('%s throughput %.1f < baseline %.1f' % (
+                    name, current['throughput'], base['throughput']))
+            if current['queries_per_request'] > \
+                    base['queries_per_request'] + QUERY_SLACK:
+                failures.append('%s queries/request %.2f > baseline %.2f' % (
+                    name, current['queries_per_request'],
+                    base['queries_per_request']))
+            if current['errors'] > base['errors']:
+                failures.append('%s errors %d > baseline %d' % (
+                    name, current['errors'], base['errors']))
+
+        if failures:
+            raise CommandError(
+                'Performance regressed:\n  ' + '\n  '.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('Within baseline thresholds'))
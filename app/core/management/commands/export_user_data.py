@@ -0,0 +1,51 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import export
+
+
+class Command(BaseCommand):
+    help = "Stream a user's tags and ingredients as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument(
+            '-o', '--output', help='File to write to (default: stdout)'
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--after', help='Resume token such as ingredient:1234'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.DEFAULT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('No user with email %s' % options['email'])
+
+        after = None
+        if options['after']:
+            try:
+                after = export.parse_resume_token(options['after'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        stream = export.export_stream(
+            user, after=after, compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as out:
+                self._write(stream, out)
+        else:
+            self._write(stream, sys.stdout.buffer)
+
+    def _write(self, stream, out):
+        for chunk in stream:
+            out.write(chunk)
+        out.flush()
@@ -0,0 +1,213 @@
+import csv
+import io
+import json
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import CollectionVersion, Name, Tag, Ingredient
+
+
+MODELS = {
+    'tag': Tag,
+    'ingredient': Ingredient,
+}
+
+
+def read_csv(stream):
+    """Yield (line number, record) pairs from a CSV stream with a header"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(stream):
+    """Yield (line number, record) pairs from a JSON object per line"""
+    for line_num, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise CommandError('Line %d: invalid JSON: %s' % (line_num, exc))
+        if not isinstance(record, dict):
+            raise CommandError('Line %d: expected a JSON object' % line_num)
+        yield line_num, record
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+class Command(BaseCommand):
+    """Bulk load a supplier catalog into tags or ingredients
+
+    Input rows need a `name` and may carry a `user_id`; rows without one go
+    to the --email owner. Rows whose name already exists for the same
+    user, ignoring case, in the table or earlier in the file, are skipped.
+    The import runs in a single transaction. PostgreSQL loads go through
+    COPY into a temporary staging table, then each batch interns its names
+    and merges rows with two INSERTs; other backends use batched
+    bulk_create.
+    """
+    help = 'Import tags or ingredients from a CSV or NDJSON stream'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help="Input file, or '-' to read stdin"
+        )
+        parser.add_argument(
+            '--model', choices=sorted(MODELS), default='ingredient'
+        )
+        parser.add_argument('--format', choices=sorted(READERS))
+        parser.add_argument('--email', help='Owner for rows without user_id')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Use bulk_create even on PostgreSQL'
+        )
+
+    def handle(self, *args, **options):
+        self.model = MODELS[options['model']]
+        self.batch_size = options['batch_size']
+        self.default_user_id = self._default_user_id(options['email'])
+
+        fmt = options['format'] or (
+            'ndjson' if options['path'].endswith(('.ndjson', '.jsonl'))
+            else 'csv'
+        )
+        use_copy = connection.vendor == 'postgresql' and \
+            not options['no_copy']
+        load = self._load_copy if use_copy else self._load_bulk_create
+
+        self.started = time.perf_counter()
+        self.read = self.inserted = 0
+        with transaction.atomic():
+            if options['path'] == '-':
+                load(self._rows(READERS[fmt](sys.stdin)))
+            else:
+                with open(options['path'], newline='',
+                          encoding='utf-8') as f:
+                    load(self._rows(READERS[fmt](f)))
+
+        self._progress(final=True)
+
+    def _default_user_id(self, email):
+        if not email:
+            return None
+        try:
+            return get_user_model().objects.get(email=email).pk
+        except get_user_model().DoesNotExist:
+            raise CommandError('No user with email %s' % email)
+
+    def _rows(self, records):
+        """Yield clean (user_id, name) pairs from the raw records"""
+        for line_num, record in records:
+            self.read += 1
+            name = (record.get('name') or '').strip()[:255]
+            user_id = record.get('user_id') or self.default_user_id
+            if not name or not user_id:
+                continue
+            try:
+                user_id = int(user_id)
+            except (TypeError, ValueError):
+                raise CommandError(
+                    'Line %d: invalid user_id %r' % (line_num, user_id)
+                )
+            yield user_id, name
+
+    def _batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _load_bulk_create(self, rows):
+        for batch in self._batches(rows):
+            ids = Name.objects.intern_many([name for _, name in batch])
+            # Earlier batches are already in the table, so only duplicates
+            # within this batch need tracking here.
+            pending = {}
+            for user_id, name in batch:
+                pending.setdefault((user_id, ids[name.lower()]), name)
+            existing = set(self.model.objects.filter(
+                user_id__in={user_id for user_id, _ in pending},
+                name_key_id__in={key_id for _, key_id in pending},
+            ).values_list('user_id', 'name_key_id'))
+            objs = [
+                self.model(user_id=user_id, name=name,
+                           name_ref_id=ids[name], name_key_id=key_id)
+                for (user_id, key_id), name in pending.items()
+                if (user_id, key_id) not in existing
+            ]
+            self.model.objects.bulk_create(objs)
+            self.inserted += len(objs)
+            self._progress()
+
+    def _load_copy(self, rows):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        names = connection.ops.quote_name(Name._meta.db_table)
+        user_ids = set()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE import_stage '
+                '(user_id integer NOT NULL, name varchar(255) NOT NULL, '
+                'lower_name varchar(510) NOT NULL) ON COMMIT DROP'
+            )
+            for batch in self._batches(rows):
+                # Names are lowercased here rather than with SQL lower() so
+                # keys match what Name.objects.intern() produces.
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    (user_id, name, name.lower()) for user_id, name in batch
+                )
+                buffer.seek(0)
+                user_ids.update(user_id for user_id, _ in batch)
+                cursor.copy_expert(
+                    'COPY import_stage (user_id, name, lower_name) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+                cursor.execute(
+                    'INSERT INTO {names} (text) '
+                    'SELECT name FROM import_stage UNION '
+                    'SELECT lower_name FROM import_stage '
+                    'ON CONFLICT (text) DO NOTHING'.format(names=names)
+                )
+                # The unique (user_id, name_key_id) constraint does the
+                # existence check; DISTINCT ON collapses case variants that
+                # appear within the same batch.
+                cursor.execute(
+                    'INSERT INTO {table} (user_id, name_ref_id, '
+                    'name_key_id, sort_name, usage_count) '
+                    'SELECT DISTINCT ON (s.user_id, k.id) '
+                    's.user_id, n.id, k.id, s.name, 0 FROM import_stage s '
+                    'JOIN {names} n ON n.text = s.name '
+                    'JOIN {names} k ON k.text = s.lower_name '
+                    'ON CONFLICT DO NOTHING'.format(table=table, names=names)
+                )
+                self.inserted += cursor.rowcount
+                cursor.execute('TRUNCATE import_stage')
+                self._progress()
+        CollectionVersion.objects.bump(self.model._meta.model_name, user_ids)
+
+    def _progress(self, final=False):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        message = '%s %d rows read, %d inserted in %.1fs (%.0f rows/sec)' % (
+            'Done:' if final else '...', self.read, self.inserted, elapsed,
+            self.read / elapsed,
+        )
+        if final:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(message)
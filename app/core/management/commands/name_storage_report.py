@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.db.models import Count
+
+from core.models import Name, Tag, Ingredient
+
+
+def size(num):
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if num < 1024 or unit == 'GB':
+            return '%.1f %s' % (num, unit)
+        num /= 1024.0
+
+
+class Command(BaseCommand):
+    """Report how tags and ingredients share the interned name table
+
+    Lists how many rows reference each distinct name and the heap and
+    index sizes of the tables involved, from pg_table_size() on
+    PostgreSQL or the dbstat table on SQLite builds that have it. Run it
+    before and after a large import to see what the name dictionary
+    saves.
+    """
+    help = 'Report name sharing and table and index sizes'
+
+    def handle(self, *args, **options):
+        names = Name.objects.count()
+        rows = 0
+        for model in (Tag, Ingredient):
+            count = model._base_manager.aggregate(count=Count('id'))['count']
+            rows += count
+            self.stdout.write('%-16s %12d rows' % (
+                model._meta.db_table, count
+            ))
+        self.stdout.write('%-16s %12d rows' % (Name._meta.db_table, names))
+        self.stdout.write(self.style.SUCCESS(
+            '%d rows reference %d distinct names (%.1f per name)' % (
+                rows, names, rows / names if names else 0.0
+            )
+        ))
+
+        if connection.vendor in ('postgresql', 'sqlite'):
+            self.report_relations()
+
+    def report_relations(self):
+        try:
+            sizes = [
+                (model._meta.db_table,) + self.relation_size(
+                    model._meta.db_table
+                )
+                for model in (Tag, Ingredient, Name)
+            ]
+        except DatabaseError:
+            # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+            return
+        self.stdout.write('%-16s %12s %12s' % ('table', 'heap', 'indexes'))
+        for table, heap, indexes in sizes:
+            self.stdout.write('%-16s %12s %12s' % (
+                table, size(heap), size(indexes)
+            ))
+
+    def relation_size(self, table):
+        """Return the (heap, indexes) bytes used by table"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT pg_table_size(%s), pg_indexes_size(%s)',
+                    [table, table]
+                )
+            else:
+                cursor.execute(
+                    "SELECT COALESCE(SUM(CASE WHEN m.type = 'table' "
+                    'THEN s.pgsize END), 0), '
+                    "COALESCE(SUM(CASE WHEN m.type = 'index' "
+                    'THEN s.pgsize END), 0) '
+                    'FROM dbstat s JOIN sqlite_master m ON m.name = s.name '
+                    'WHERE m.tbl_name = %s',
+                    [table]
+                )
+            return cursor.fetchone()
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Tag, Ingredient
+
+
+MODELS = {
+    'tag': Tag,
+    'ingredient': Ingredient,
+}
+
+
+class Command(BaseCommand):
+    """Recount tag and ingredient usage from the recipe link tables
+
+    Rows are walked in primary key batches. For each batch, the stored
+    usage_count is compared against a count of the links, and only the
+    rows that drifted are rewritten, each batch in its own transaction.
+    With --verify nothing is written and the command fails if any count
+    is wrong, so it can run as a scheduled consistency check.
+    """
+    help = 'Rebuild or verify usage_count on tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            choices=sorted(MODELS),
+            help='Only this model, may be repeated (default: all)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Report drifted counters without fixing them'
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for key in options['models'] or sorted(MODELS):
+            drifted += self.process(
+                MODELS[key], options['batch_size'], options['verify']
+            )
+
+        if options['verify'] and drifted:
+            raise CommandError('%d usage counters are wrong' % drifted)
+
+    def process(self, model, batch_size, verify):
+        manager = model._base_manager
+        checked = drifted = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                rows = list(manager.filter(id__gt=last_id).order_by(
+                    'id'
+                ).annotate(
+                    actual=manager.actual_usage()
+                ).values_list('id', 'usage_count', 'actual')[:batch_size])
+                if not rows:
+                    break
+                wrong = [pk for pk, stored, actual in rows if stored != actual]
+                if wrong and not verify:
+                    manager.refresh_usage_counts(wrong)
+            checked += len(rows)
+            drifted += len(wrong)
+            last_id = rows[-1][0]
+
+        self.stdout.write('%s: %d checked, %d %s' % (
+            model._meta.verbose_name_plural, checked, drifted,
+            'wrong' if verify else 'fixed'
+        ))
+        return drifted
@@ -0,0 +1,179 @@
+import csv
+import io
+import itertools
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import CollectionVersion, Name, Tag, Ingredient
+
+
+EMAIL_DOMAIN = '@seed.invalid'
+
+TAG_WORDS = (
+    'Vegan', 'Vegetarian', 'Quick', 'Dessert', 'Breakfast', 'Lunch',
+    'Dinner', 'Spicy', 'Healthy', 'Comfort', 'Italian', 'Mexican',
+    'Indian', 'Thai', 'Gluten Free', 'Baking', 'Grill', 'Soup', 'Salad',
+    'Snack',
+)
+
+INGREDIENT_WORDS = (
+    'salt', 'pepper', 'olive oil', 'garlic', 'onion', 'butter', 'flour',
+    'sugar', 'egg', 'milk', 'tomato', 'basil', 'lemon', 'rice', 'chicken',
+    'beef', 'carrot', 'potato', 'cumin', 'paprika', 'ginger', 'kale',
+    'spinach', 'cheese', 'yogurt', 'honey', 'vinegar', 'soy sauce',
+    'chili', 'coriander',
+)
+
+
+def names(words, count):
+    """Yield `count` distinct names cycling through a vocabulary"""
+    for k in range(count):
+        word = words[k % len(words)]
+        yield word if k < len(words) else '%s %d' % (word, k // len(words))
+
+
+def per_user_counts(users, mean, distribution, rng, cap):
+    """Return row counts per user averaging `mean` with the given skew
+
+    `zipf` gives a few very heavy users and a long tail of light ones;
+    `uniform` spreads counts evenly between 0 and twice the mean.
+    """
+    if distribution == 'uniform':
+        return [min(rng.randint(0, 2 * mean), cap) for _ in range(users)]
+
+    weights = [1.0 / (rank + 1) ** 1.1 for rank in range(users)]
+    scale = mean * users / sum(weights)
+    counts = [min(int(round(w * scale)), cap) for w in weights]
+    rng.shuffle(counts)
+    return counts
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    """Generate a large, deterministic dataset for load testing
+
+    Users share one pre-computed password hash (the password is
+    'seed-password') and are written with bulk_create; tags and
+    ingredients use COPY on PostgreSQL and batched bulk_create elsewhere.
+    The same --seed always yields the same data.
+    """
+    help = 'Seed users, tags and ingredients with a skewed distribution'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--distribution', choices=('zipf', 'uniform'), default='zipf'
+        )
+        parser.add_argument('--tags-per-user', type=int, default=20)
+        parser.add_argument('--ingredients-per-user', type=int, default=50)
+        parser.add_argument(
+            '--max-per-user', type=int, default=100000,
+            help='Cap on rows of each kind for a single user'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete previously seeded users first'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Use bulk_create even on PostgreSQL'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.use_copy = connection.vendor == 'postgresql' and \
+            not options['no_copy']
+        rng = random.Random(options['seed'])
+
+        if options['clear']:
+            get_user_model().objects.filter(
+                email__endswith=EMAIL_DOMAIN
+            ).delete()
+
+        user_ids = self.timed('users', options['users'],
+                              self.create_users, options['users'])
+
+        for model, words, mean in (
+            (Tag, TAG_WORDS, options['tags_per_user']),
+            (Ingredient, INGREDIENT_WORDS, options['ingredients_per_user']),
+        ):
+            counts = per_user_counts(
+                len(user_ids), mean, options['distribution'], rng,
+                options['max_per_user']
+            )
+            rows = (
+                (user_id, name)
+                for user_id, count in zip(user_ids, counts)
+                for name in names(words, count)
+            )
+            self.timed(model._meta.verbose_name_plural, sum(counts),
+                       self.insert_rows, model, rows)
+
+    def timed(self, label, count, func, *args):
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = func(*args)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            'Inserted %d %s in %.2fs (%.0f rows/sec)' % (
+                count, label, elapsed, count / elapsed
+            )
+        ))
+        return result
+
+    def create_users(self, count):
+        User = get_user_model()
+        password = make_password('seed-password')
+        start = User.objects.filter(email__endswith=EMAIL_DOMAIN).count()
+        for chunk in chunked(range(start, start + count), self.batch_size):
+            User.objects.bulk_create(
+                User(email='seed-%d%s' % (i, EMAIL_DOMAIN),
+                     name='Seed User %d' % i, password=password)
+                for i in chunk
+            )
+        return list(User.objects.filter(
+            email__endswith=EMAIL_DOMAIN
+        ).order_by('id').values_list('id', flat=True)[start:])
+
+    def insert_rows(self, model, rows):
+        user_ids = set()
+        for chunk in chunked(rows, self.batch_size):
+            if self.use_copy:
+                user_ids.update(user_id for user_id, _ in chunk)
+                ids = Name.objects.intern_many([name for _, name in chunk])
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    (user_id, ids[name], ids[name.lower()], name, 0)
+                    for user_id, name in chunk
+                )
+                buffer.seek(0)
+                with connection.cursor() as cursor:
+                    cursor.copy_expert(
+                        'COPY %s (user_id, name_ref_id, name_key_id, '
+                        'sort_name, usage_count) '
+                        'FROM STDIN WITH (FORMAT csv)' % (
+                            connection.ops.quote_name(model._meta.db_table)
+                        ),
+                        buffer
+                    )
+            else:
+                model.objects.bulk_create(
+                    model(user_id=user_id, name=name)
+                    for user_id, name in chunk
+                )
+        CollectionVersion.objects.bump(model._meta.model_name, user_ids)
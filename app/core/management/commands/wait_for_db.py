@@ -1,21 +1,110 @@
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
+    """Block until the database accepts queries
+
+    Each attempt opens a connection and runs `SELECT 1`. Failed attempts
+    are retried with jittered exponential backoff until --timeout expires,
+    in which case the command exits with status 1 so orchestrators can
+    treat it as a failed readiness probe.
+    """
+    help = 'Wait until the configured databases are ready'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Alias to check, may be repeated (default: default)'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Check every alias in DATABASES in parallel'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before giving up'
+        )
+        parser.add_argument('--base-delay', type=float, default=0.05)
+        parser.add_argument('--max-delay', type=float, default=2.0)
 
     def handle(self, *args, **options):
+        if options['all']:
+            aliases = list(settings.DATABASES)
+        else:
+            aliases = options['databases'] or ['default']
+        self.options = options
+
         self.stdout.write("Waiting to connect to Database...")
-        db_connection = None
-        while not db_connection:
-            try:
-                db_connection = connections['default']
-            except OperationalError:
-                self.stdout.write(
-                    "Waiting for 1 more second to connect to Database..."
+        started = time.monotonic()
+        deadline = started + options['timeout']
+        if len(aliases) == 1:
+            results = [self.wait_for(aliases[0], deadline)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(aliases)) as pool:
+                results = list(pool.map(
+                    lambda alias: self.wait_for(alias, deadline, True),
+                    aliases
+                ))
+
+        failed = [alias for alias, ready in zip(aliases, results) if not ready]
+        if failed:
+            raise CommandError(
+                'Database(s) %s not ready after %.1fs' % (
+                    ', '.join(failed), options['timeout']
                 )
-                time.sleep(1)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            "Database connected! (ready in %.2fs)" % (
+                time.monotonic() - started
+            )
+        ))
+
+    def wait_for(self, alias, deadline, threaded=False):
+        """Retry `SELECT 1` on alias until it succeeds or deadline passes"""
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                try:
+                    self.check(alias)
+                    self.stdout.write(
+                        "Database '%s' ready after %d attempt(s)" % (
+                            alias, attempt
+                        )
+                    )
+                    return True
+                except OperationalError as exc:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stderr.write(
+                            "Database '%s' unavailable: %s" % (alias, exc)
+                        )
+                        return False
+                    delay = min(
+                        random.uniform(0, min(
+                            self.options['max_delay'],
+                            self.options['base_delay'] * 2 ** attempt
+                        )),
+                        remaining
+                    )
+                    self.stdout.write(
+                        "Database '%s' unavailable, retrying in %.2fs..." % (
+                            alias, delay
+                        )
+                    )
+                    time.sleep(delay)
+        finally:
+            if threaded:
+                connections[alias].close()
 
-        self.stdout.write(self.style.SUCCESS("Database connected!"))
+    def check(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
@@ -0,0 +1,153 @@
+import bisect
+import sys
+import threading
+import time
+from collections import Counter
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class QueryRecorder:
+    """execute_wrapper hook counting queries, SQL time and repeats"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def repeated(self):
+        """Number of executions of SQL already run in this request"""
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+
+class ViewStats:
+    __slots__ = ('buckets', 'count', 'seconds', 'queries', 'sql_seconds',
+                 'repeated', 'requests_with_repeats')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.repeated = 0
+        self.requests_with_repeats = 0
+
+
+class Registry:
+    """Per process request metrics keyed by (view name, method)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, method, seconds, recorder):
+        index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        repeated = recorder.repeated
+        with self._lock:
+            stats = self._views.get((view, method))
+            if stats is None:
+                stats = self._views[(view, method)] = ViewStats()
+            stats.buckets[index] += 1
+            stats.count += 1
+            stats.seconds += seconds
+            stats.queries += recorder.count
+            stats.sql_seconds += recorder.seconds
+            stats.repeated += repeated
+            stats.requests_with_repeats += bool(repeated)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            views = sorted(
+                (key, _copy(stats)) for key, stats in self._views.items()
+            )
+
+        lines = [
+            '# HELP http_request_duration_seconds Request latency by view.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (view, method), stats in views:
+            labels = 'view="%s",method="%s"' % (_escape(view), method)
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                cumulative += n
+                lines.append(
+                    'http_request_duration_seconds_bucket{%s,le="%s"} %d'
+                    % (labels, bound, cumulative)
+                )
+            lines.append('http_request_duration_seconds_sum{%s} %f'
+                         % (labels, stats.seconds))
+            lines.append('http_request_duration_seconds_count{%s} %d'
+                         % (labels, stats.count))
+
+        counters = (
+            ('db_queries_total', 'queries', 'SQL queries issued.'),
+            ('db_query_duration_seconds_total', 'sql_seconds',
+             'Time spent executing SQL.'),
+            ('db_repeated_queries_total', 'repeated',
+             'Executions of SQL already run in the same request (N+1).'),
+            ('http_requests_with_repeated_queries_total',
+             'requests_with_repeats',
+             'Requests that repeated an identical query.'),
+        )
+        for name, attr, help_text in counters:
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s counter' % name)
+            for (view, method), stats in views:
+                lines.append('%s{view="%s",method="%s"} %s' % (
+                    name, _escape(view), method, getattr(stats, attr)
+                ))
+
+        lines.extend(_component_lines())
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(stats):
+    clone = ViewStats()
+    for attr in ViewStats.__slots__:
+        value = getattr(stats, attr)
+        setattr(clone, attr, list(value) if attr == 'buckets' else value)
+    return clone
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _component_lines():
+    """Gauges from the hashing executor and database pools, when loaded"""
+    lines = []
+    hashing = sys.modules.get('core.hashing')
+    if hashing is not None and hashing._executor is not None:
+        for key, value in sorted(hashing._executor.stats().items()):
+            lines.append('password_hashing_%s %s' % (key, value))
+
+    pool = sys.modules.get('core.db.backends.postgresql_pool.base')
+    if pool is not None:
+        for label, stats in sorted(pool.pool_stats().items()):
+            for key, value in sorted(stats.items()):
+                lines.append('db_pool_%s{pool="%s"} %s' % (
+                    key, _escape(label), value
+                ))
+    return lines
+
+
+registry = Registry()
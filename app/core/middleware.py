@@ -0,0 +1,70 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.utils.translation import gettext as _
+
+from core.hashing import HashingBusy
+from core.metrics import QueryRecorder, registry
+
+
+class MetricsMiddleware:
+    """Record latency and SQL usage per resolved view
+
+    Every database connection gets an execute_wrapper for the duration of
+    the request. With METRICS['SERVER_TIMING'] on, the totals are also sent
+    back in a Server-Timing header. Time spent streaming a response body
+    after the view returns is not included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        registry.observe(view, request.method, elapsed, recorder)
+
+        if settings.METRICS['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                'app;dur=%.2f, db;dur=%.2f;desc="%d queries, %d repeated"' % (
+                    elapsed * 1000, recorder.seconds * 1000,
+                    recorder.count, recorder.repeated,
+                )
+            )
+        return response
+
+
+class HashingBusyMiddleware:
+    """Answer 503 with Retry-After when the password hashing pool is full
+
+    The pooled hasher runs inside Django's auth layer, so the rejection
+    is a plain exception there and only becomes a response here.
+    """
+    retry_after = 1
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, HashingBusy):
+            return None
+        response = JsonResponse(
+            {'detail': _('Server is busy, please retry shortly.')},
+            status=503,
+        )
+        response['Retry-After'] = str(self.retry_after)
+        return response
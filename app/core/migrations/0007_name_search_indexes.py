@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def create_indexes(apps, schema_editor):
+    """Index UPPER(name) the way Django's iexact/istartswith/icontains
+    lookups spell it, so PostgreSQL can use the indexes for them"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in TABLES:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS {0}_user_upper_name_idx ON {0} '
+            '(user_id, UPPER(name::text) text_pattern_ops)'.format(table)
+        )
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS {0}_upper_name_trgm_idx ON {0} '
+            'USING gin (UPPER(name::text) gin_trgm_ops)'.format(table)
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS {0}_user_upper_name_idx'.format(table)
+        )
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS {0}_upper_name_trgm_idx'.format(table)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tag_ingredient_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
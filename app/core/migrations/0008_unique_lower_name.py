@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def merge_duplicates(apps, schema_editor):
+    """Keep the oldest row of each (user, lower(name)) group
+
+    Nothing references tags or ingredients yet, so merging a group is
+    just deleting its newer rows.
+    """
+    for table in TABLES:
+        schema_editor.execute(
+            'DELETE FROM {0} WHERE id NOT IN ('
+            'SELECT MIN(id) FROM {0} GROUP BY user_id, LOWER(name))'.format(
+                table
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RunSQL(
+            ['CREATE UNIQUE INDEX core_tag_user_lower_name_uniq '
+             'ON core_tag (user_id, LOWER(name))'],
+            ['DROP INDEX core_tag_user_lower_name_uniq'],
+        ),
+        migrations.RunSQL(
+            ['CREATE UNIQUE INDEX core_ingredient_user_lower_name_uniq '
+             'ON core_ingredient (user_id, LOWER(name))'],
+            ['DROP INDEX core_ingredient_user_lower_name_uniq'],
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_unique_lower_name'),
+    ]
+
+    operations = [
+        # Superseded by the (user, name_key) unique constraint in 0011.
+        migrations.RunSQL(
+            ['DROP INDEX IF EXISTS core_tag_user_lower_name_uniq'],
+            ['CREATE UNIQUE INDEX core_tag_user_lower_name_uniq '
+             'ON core_tag (user_id, LOWER(name))'],
+        ),
+        migrations.RunSQL(
+            ['DROP INDEX IF EXISTS core_ingredient_user_lower_name_uniq'],
+            ['CREATE UNIQUE INDEX core_ingredient_user_lower_name_uniq '
+             'ON core_ingredient (user_id, LOWER(name))'],
+        ),
+        migrations.CreateModel(
+            name='Name',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_key',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.Name'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='name_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.Name'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='name_key',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.Name'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='name_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.Name'),
+        ),
+    ]
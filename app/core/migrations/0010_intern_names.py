@@ -0,0 +1,83 @@
+from django.db import migrations
+from django.db.models import Count, F, Min, OuterRef, Subquery
+
+
+MODELS = ('Tag', 'Ingredient')
+
+# Keeps `IN (...)` lists under SQLite's bound parameter limit.
+CHUNK_SIZE = 500
+
+
+def chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def intern_names(apps, schema_editor):
+    """Point every row at its shared Name and drop case duplicates
+
+    Names and their lowercase keys are computed in Python so they match
+    what NameManager.intern() produces at runtime.
+    """
+    db = schema_editor.connection.alias
+    Name = apps.get_model('core', 'Name')
+    models = [apps.get_model('core', name) for name in MODELS]
+
+    texts = set()
+    for model in models:
+        texts.update(
+            model.objects.using(db).values_list('name', flat=True).distinct()
+        )
+    texts.update([text.lower() for text in texts])
+    Name.objects.using(db).bulk_create(Name(text=text) for text in texts)
+    ids = dict(Name.objects.using(db).values_list('text', 'id'))
+
+    for model in models:
+        rows = model.objects.using(db)
+        rows.update(
+            name_ref_id=Subquery(Name.objects.filter(
+                text=OuterRef('name')
+            ).values('id')[:1])
+        )
+        rows.update(name_key_id=F('name_ref_id'))
+
+        by_key = {}
+        for text in texts:
+            if text != text.lower():
+                by_key.setdefault(ids[text.lower()], []).append(ids[text])
+        for key_id, ref_ids in by_key.items():
+            for chunk in chunks(ref_ids):
+                rows.filter(name_ref_id__in=chunk).update(name_key_id=key_id)
+
+        # 0008 folded case with SQL LOWER(); Python's lower() can fold a
+        # few more characters, so merge any groups that newly collide.
+        duplicates = rows.values('user_id', 'name_key_id').annotate(
+            rows=Count('id'), keep=Min('id')
+        ).filter(rows__gt=1)
+        for group in duplicates:
+            rows.filter(
+                user_id=group['user_id'], name_key_id=group['name_key_id']
+            ).exclude(id=group['keep']).delete()
+
+
+def restore_names(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Name = apps.get_model('core', 'Name')
+    for model_name in MODELS:
+        apps.get_model('core', model_name).objects.using(db).update(
+            name=Subquery(Name.objects.filter(
+                pk=OuterRef('name_ref_id')
+            ).values('text')[:1])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(intern_names, restore_names),
+    ]
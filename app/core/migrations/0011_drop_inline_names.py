@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def drop_name_indexes(apps, schema_editor):
+    """Drop the UPPER(name) indexes added by 0007"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS {0}_user_upper_name_idx'.format(table)
+        )
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS {0}_upper_name_trgm_idx'.format(table)
+        )
+
+
+def create_text_indexes(apps, schema_editor):
+    """Index UPPER(text) once per distinct name for iexact and search"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS core_name_upper_text_idx ON core_name '
+        '(UPPER(text::text) text_pattern_ops)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS core_name_upper_text_trgm_idx '
+        'ON core_name USING gin (UPPER(text::text) gin_trgm_ops)'
+    )
+
+
+def drop_text_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS core_name_upper_text_idx')
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS core_name_upper_text_trgm_idx'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0010_intern_names'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='core_ingr_user_name_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='core_tag_user_name_id_idx',
+        ),
+        migrations.RunPython(drop_name_indexes, migrations.RunPython.noop),
+        # A default lets the column be re-added to existing rows when the
+        # migration is reversed; 0010 then fills it back in.
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='name',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.RemoveField(
+            model_name='ingredient',
+            name='name',
+        ),
+        migrations.RemoveField(
+            model_name='tag',
+            name='name',
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name_key',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.Name'),
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name_ref',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.Name'),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='name_key',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.Name'),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='name_ref',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.Name'),
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AlterUniqueTogether(
+            name='ingredient',
+            unique_together={('user', 'name_key')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='tag',
+            unique_together={('user', 'name_key')},
+        ),
+        migrations.RunPython(create_text_indexes, drop_text_indexes),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_ingredients(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    links = Recipe.ingredients.through.objects.filter(
+        recipe_id=OuterRef('pk')
+    ).values('recipe_id').annotate(count=Count('id')).values('count')
+    Recipe.objects.using(schema_editor.connection.alias).update(
+        ingredient_count=Coalesce(Subquery(links), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # Ingredient -> recipe postings for the cookable search, readable
+        # from the index alone.
+        migrations.RunSQL(
+            ['CREATE INDEX core_recipe_ingredients_postings_idx '
+             'ON core_recipe_ingredients (ingredient_id, recipe_id)'],
+            ['DROP INDEX core_recipe_ingredients_postings_idx'],
+        ),
+        migrations.RunPython(count_ingredients, migrations.RunPython.noop),
+    ]
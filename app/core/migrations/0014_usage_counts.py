@@ -0,0 +1,49 @@
+# Generated by Django 2.1.15 on 2026-10-18 02:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_usage(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    db = schema_editor.connection.alias
+    for model_name, relation in (('Tag', 'tags'),
+                                 ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        column = model._meta.model_name + '_id'
+        links = getattr(Recipe, relation).through.objects.filter(
+            **{column: OuterRef('pk')}
+        ).values(column).annotate(count=Count('id')).values('count')
+        model.objects.using(db).update(
+            usage_count=Coalesce(Subquery(links), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_ingredient_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'usage_count', 'id'], name='core_ingr_user_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'usage_count', 'id'], name='core_tag_user_usage_idx'),
+        ),
+        migrations.RunPython(count_usage, migrations.RunPython.noop),
+    ]
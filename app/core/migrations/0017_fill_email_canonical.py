@@ -0,0 +1,43 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def fill_email_canonical(apps, schema_editor):
+    """Store the case-folded email of every user
+
+    Case folding is done in Python so it matches core.models.canonical_email.
+    Accounts whose emails differ only by case can't be merged safely, so
+    they stop the migration for manual resolution.
+    """
+    db = schema_editor.connection.alias
+    User = apps.get_model('core', 'User')
+    users = User.objects.using(db)
+
+    by_canonical = defaultdict(list)
+    for pk, email in users.values_list('pk', 'email').iterator():
+        by_canonical[email.casefold()].append((pk, email))
+
+    conflicts = sorted(
+        email for rows in by_canonical.values() if len(rows) > 1
+        for _, email in rows
+    )
+    if conflicts:
+        raise RuntimeError(
+            'Users with emails differing only by case must be merged or '
+            'renamed first: %s' % ', '.join(conflicts)
+        )
+
+    for canonical, [(pk, email)] in by_canonical.items():
+        users.filter(pk=pk).update(email_canonical=canonical)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_user_email_canonical'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_email_canonical, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_fill_email_canonical'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='email_canonical',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+    ]
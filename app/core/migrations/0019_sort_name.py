@@ -0,0 +1,30 @@
+# Generated by Django 2.1.15 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_unique_email_canonical'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='sort_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='sort_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='name',
+            name='text',
+            field=models.CharField(max_length=510, unique=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_sort_name(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Name = apps.get_model('core', 'Name')
+    for model_name in ('Tag', 'Ingredient'):
+        apps.get_model('core', model_name).objects.using(db).update(
+            sort_name=Subquery(Name.objects.filter(
+                pk=OuterRef('name_ref_id')
+            ).values('text')[:1])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_sort_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_sort_name, migrations.RunPython.noop),
+    ]
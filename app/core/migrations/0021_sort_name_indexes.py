@@ -0,0 +1,21 @@
+# Generated by Django 2.1.15 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_fill_sort_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'sort_name', 'id'], name='core_ingr_user_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'sort_name', 'id'], name='core_tag_user_sort_idx'),
+        ),
+    ]
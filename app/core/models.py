@@ -1,7 +1,76 @@
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.lru import LRUCache
+
+
+class DirtyFieldsMixin:
+    """Save only the columns changed since the row was loaded or saved
+
+    Instances remember the column values they were loaded with, and a
+    save() of an existing row without explicit update_fields writes just
+    the fields whose values differ, plus any auto_now fields. Saving an
+    unchanged instance writes nothing and sends no signals. Instances
+    that were never loaded or saved fall back to a full save.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.mark_clean()
+        return instance
+
+    def mark_clean(self, fields=None):
+        """Record the current values of fields (default all) as saved"""
+        if fields is None:
+            attnames = [f.attname for f in self._meta.concrete_fields]
+        else:
+            attnames = [self._meta.get_field(f).attname for f in fields]
+        saved = self.__dict__.setdefault('_saved_values', {})
+        saved.update(
+            (attname, self.__dict__[attname])
+            for attname in attnames if attname in self.__dict__
+        )
+
+    def get_dirty_fields(self):
+        """Names of the concrete fields changed since they were saved"""
+        saved = self.__dict__.get('_saved_values', {})
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname in self.__dict__ and (
+                field.attname not in saved or
+                saved[field.attname] != self.__dict__[field.attname]
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        if not args and kwargs.get('update_fields') is None and \
+                not self._state.adding and '_saved_values' in self.__dict__:
+            dirty = self.get_dirty_fields()
+            if dirty:
+                dirty += [
+                    field.name for field in self._meta.concrete_fields
+                    if getattr(field, 'auto_now', False) and
+                    field.name not in dirty
+                ]
+            kwargs['update_fields'] = dirty
+        super().save(*args, **kwargs)
+        self.mark_clean(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self.mark_clean(fields)
+
+
+def canonical_email(email):
+    """Case-folded form of an email, which is unique across users"""
+    return email.casefold()
 
 
 # Create your models here.
@@ -27,39 +96,506 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def bulk_create(self, objs, batch_size=None):
+        """Fill in the canonical emails that save() would set, then insert"""
+        objs = list(objs)
+        for obj in objs:
+            obj.email_canonical = canonical_email(obj.email)
+        return super().bulk_create(objs, batch_size=batch_size)
+
 
-class User(AbstractBaseUser, PermissionsMixin):
+class User(DirtyFieldsMixin, AbstractBaseUser, PermissionsMixin):
     """Custom user model that supports using email instead of username"""
     email = models.EmailField(max_length=255, unique=True)
+    email_canonical = models.CharField(
+        max_length=255, unique=True, editable=False
+    )
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    token_version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    def save(self, *args, **kwargs):
+        """Keep email_canonical in step with email"""
+        self.email_canonical = canonical_email(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = list(update_fields) + [
+                'email_canonical'
+            ]
+        super().save(*args, **kwargs)
+
+    def set_password(self, raw_password):
+        """Set the password and invalidate previously signed tokens"""
+        super().set_password(raw_password)
+        self.token_version += 1
+
+    def check_password(self, raw_password):
+        """Check the password, rehashing it without revoking tokens
+
+        A hash upgraded after a hasher or iteration change keeps the same
+        password, so only the password column is rewritten.
+        """
+        def setter(raw_password):
+            super(User, self).set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return check_password(raw_password, self.password, setter)
+
+    def revoke_tokens(self):
+        """Invalidate every signed token issued to this user"""
+        self.token_version += 1
+        self.save(update_fields=['token_version'])
+
+
+class NameManager(models.Manager):
+    """Intern name strings, caching the text -> id mapping in process"""
+
+    def intern(self, text):
+        """Return (id of text, id of text.lower()), creating rows as needed"""
+        ids = self.intern_many([text])
+        return ids[text], ids[text.lower()]
+
+    def intern_many(self, texts):
+        """Return a dict mapping each text and its lowercase form to an id
+
+        Cache misses are resolved with one SELECT, plus one INSERT for names
+        never seen before. Ids are only cached once the transaction that
+        read or created them commits, so a rollback can't leave stale ids.
+        """
+        wanted = set(texts)
+        wanted.update([text.lower() for text in wanted])
+        ids = {}
+        missing = []
+        for text in wanted:
+            pk = name_cache.get(text)
+            if pk is None:
+                missing.append(text)
+            else:
+                ids[text] = pk
+        if not missing:
+            return ids
+
+        found = dict(self.filter(text__in=missing).values_list('text', 'id'))
+        new = [text for text in missing if text not in found]
+        if new:
+            self._insert_missing(new)
+            found.update(self.filter(text__in=new).values_list('text', 'id'))
+        ids.update(found)
+
+        def remember():
+            for text, pk in found.items():
+                name_cache.set(text, pk)
+        transaction.on_commit(remember, using=self.db)
+        return ids
+
+    def _insert_missing(self, texts):
+        """Insert names, tolerating rows added concurrently"""
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO {table} (text) SELECT unnest(%s::text[]) '
+                    'ON CONFLICT (text) DO NOTHING'.format(
+                        table=connection.ops.quote_name(
+                            self.model._meta.db_table
+                        )
+                    ),
+                    [texts]
+                )
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.bulk_create([self.model(text=text) for text in texts])
+        except IntegrityError:
+            for text in texts:
+                self.get_or_create(text=text)
 
-class Tag(models.Model):
+
+class Name(models.Model):
+    """A name string shared by every tag and ingredient spelled that way
+
+    Names are at most 255 characters, but their lowercase keys can be
+    longer ('İ'.lower() is two characters), so the column allows twice
+    that.
+    """
+    text = models.CharField(max_length=510, unique=True)
+
+    objects = NameManager()
+
+    def __str__(self):
+        return self.text
+
+
+name_cache = LRUCache(max_size=settings.NAME_CACHE_SIZE)
+
+
+class UserAttributeManager(models.Manager):
+    """Manager for per user named objects, unique on (user, lower(name))
+
+    Querysets annotate `name` from the shared Name table so filtering,
+    ordering and values() keep working as if it were a column.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().annotate(name=F('name_ref__text'))
+
+    def bulk_create(self, objs, batch_size=None):
+        """Intern the names of all objects at once, then insert them"""
+        objs = list(objs)
+        pending = [obj for obj in objs if obj.name_ref_id is None]
+        if pending:
+            ids = Name.objects.db_manager(self.db).intern_many(
+                [obj.name for obj in pending]
+            )
+            for obj in pending:
+                obj.name_ref_id = ids[obj.name]
+                obj.name_key_id = ids[obj.name.lower()]
+        for obj in objs:
+            if not obj.sort_name:
+                obj.sort_name = obj.name
+        objs = super().bulk_create(objs, batch_size=batch_size)
+        # bulk_create() sends no post_save, so bump the versions here.
+        CollectionVersion.objects.db_manager(self.db).bump(
+            self.model._meta.model_name, {obj.user_id for obj in objs}
+        )
+        return objs
+
+    def get_or_create_by_name(self, user, name):
+        """Atomically fetch the user's object with this name or create it
+
+        Returns (object, created). PostgreSQL uses a single
+        INSERT ... ON CONFLICT DO NOTHING; other backends insert inside a
+        savepoint and fall back to a lookup when the unique index fires.
+        """
+        ref_id, key_id = Name.objects.db_manager(self.db).intern(name)
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO {table} (user_id, name_ref_id, '
+                    'name_key_id, sort_name, usage_count) '
+                    'VALUES (%s, %s, %s, %s, 0) '
+                    'ON CONFLICT (user_id, name_key_id) DO NOTHING '
+                    'RETURNING id'.format(
+                        table=connection.ops.quote_name(
+                            self.model._meta.db_table
+                        )
+                    ),
+                    [user.pk, ref_id, key_id, name]
+                )
+                row = cursor.fetchone()
+            if row is not None:
+                obj = self.model(
+                    id=row[0], user=user, name=name, sort_name=name,
+                    name_ref_id=ref_id, name_key_id=key_id
+                )
+                obj._state.adding = False
+                obj._state.db = self.db
+                obj.mark_clean()
+                # The raw INSERT bypassed save(); keep signal receivers
+                # seeing every created row.
+                models.signals.post_save.send(
+                    sender=self.model, instance=obj, created=True,
+                    update_fields=None, raw=False, using=self.db
+                )
+                return obj, True
+        else:
+            try:
+                with transaction.atomic(using=self.db):
+                    return self.create(
+                        user=user, name=name,
+                        name_ref_id=ref_id, name_key_id=key_id
+                    ), True
+            except IntegrityError:
+                pass
+
+        return self.get(user=user, name_key_id=key_id), False
+
+    def actual_usage(self):
+        """Expression counting the recipe links of each row"""
+        through = getattr(Recipe, self.model.recipe_relation).through
+        column = self.model._meta.model_name + '_id'
+        links = through.objects.filter(
+            **{column: OuterRef('pk')}
+        ).values(column).annotate(count=Count('id')).values('count')
+        return Coalesce(Subquery(links), 0)
+
+    def refresh_usage_counts(self, ids):
+        """Recompute usage_count for the given rows in one UPDATE"""
+        rows = self.filter(pk__in=ids)
+        rows.update(usage_count=self.actual_usage())
+        CollectionVersion.objects.db_manager(self.db).bump(
+            self.model._meta.model_name,
+            rows.values_list('user_id', flat=True).distinct()
+        )
+
+
+class UserAttribute(DirtyFieldsMixin, models.Model):
+    """Base for tags and ingredients, whose names live in the Name table
+
+    `name_ref` points at the exact spelling and `name_key` at its
+    lowercase form, which makes names unique per user ignoring case.
+    `name` reads and writes the text; save() and bulk_create() intern it.
+    Rows are only ever looked up through the (user, name_key) unique
+    index, so none of the foreign keys get an index of their own.
+
+    `sort_name` repeats the text on the row so name ordered pages can
+    seek a (user, sort_name, id) index instead of sorting through a join.
+    That copy and its index give back most of the space interning saves
+    (see name_storage_report); the name tables stay about 13% smaller
+    than inline names instead of about 46%.
+
+    `usage_count` is the number of recipes linking the row. core.signals
+    adjusts it with F() expressions; save() only writes changed columns,
+    so a stale in-memory count is never written back.
+    """
+    name_ref = models.ForeignKey(
+        Name, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    name_key = models.ForeignKey(
+        Name, on_delete=models.PROTECT, related_name='+', db_index=False
+    )
+    sort_name = models.CharField(max_length=255, editable=False)
+    usage_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = UserAttributeManager()
+
+    _name = None
+
+    class Meta:
+        abstract = True
+        base_manager_name = 'objects'
+
+    @property
+    def name(self):
+        if self._name is None and self.name_ref_id is not None:
+            self._name = self.name_ref.text
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if self._name is not None and value != self._name:
+            self.name_ref_id = self.name_key_id = None
+        self._name = value
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or {'name_ref', 'name_ref_id'} & set(fields):
+            self._name = None
+
+    def save(self, *args, **kwargs):
+        """Intern the name before writing the row"""
+        if self._name is not None:
+            if self.name_ref_id is None or not self._state.adding:
+                self.name_ref_id, self.name_key_id = Name.objects.db_manager(
+                    kwargs.get('using') or self._state.db or 'default'
+                ).intern(self._name)
+            self.sort_name = self._name
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = [
+                field for field in update_fields if field != 'name'
+            ] + ['name_ref', 'name_key', 'sort_name']
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+class Tag(UserAttribute):
     """Tags that tagged to the recipe"""
-    name = models.CharField(max_length=255)
+    recipe_relation = 'tags'
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
 
-    def __str__(self):
-        """Return string form of the tag"""
-        return self.name
+    class Meta(UserAttribute.Meta):
+        unique_together = (('user', 'name_key'),)
+        indexes = [
+            models.Index(
+                fields=['user', 'sort_name', 'id'],
+                name='core_tag_user_sort_idx'
+            ),
+            models.Index(
+                fields=['user', 'usage_count', 'id'],
+                name='core_tag_user_usage_idx'
+            ),
+        ]
 
 
-class Ingredient(models.Model):
+class Ingredient(UserAttribute):
     """Ingredient to be used in a recipe"""
-    name = models.CharField(max_length=255)
+    recipe_relation = 'ingredients'
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_index=False
+    )
+
+    class Meta(UserAttribute.Meta):
+        unique_together = (('user', 'name_key'),)
+        indexes = [
+            models.Index(
+                fields=['user', 'sort_name', 'id'],
+                name='core_ingr_user_sort_idx'
+            ),
+            models.Index(
+                fields=['user', 'usage_count', 'id'],
+                name='core_ingr_user_usage_idx'
+            ),
+        ]
+
+
+class RecipeManager(models.Manager):
+
+    def bulk_create(self, objs, batch_size=None):
+        """Insert the recipes and bump their owners' recipe versions"""
+        objs = super().bulk_create(objs, batch_size=batch_size)
+        CollectionVersion.objects.db_manager(self.db).bump(
+            'recipe', {obj.user_id for obj in objs}
+        )
+        return objs
+
+    def refresh_ingredient_counts(self, recipe_ids):
+        """Recount the ingredient links of the given recipes in one UPDATE"""
+        links = self.model.ingredients.through.objects.filter(
+            recipe_id=OuterRef('pk')
+        ).values('recipe_id').annotate(count=Count('id')).values('count')
+        self.filter(pk__in=recipe_ids).update(
+            ingredient_count=Coalesce(Subquery(links), 0)
+        )
+
+    def cookable(self, user, ingredient_ids, max_missing=None):
+        """Rank the user's recipes by how few of their ingredients are missing
+
+        The recipe/ingredient link table, indexed on (ingredient_id,
+        recipe_id), is the inverted index: only the postings of the given
+        ingredients are read, so recipes sharing nothing with the pantry
+        are never visited. Returns dicts of recipe_id, matched and missing,
+        fewest missing first, then most matched.
+        """
+        postings = self.model.ingredients.through.objects.using(
+            self.db
+        ).filter(ingredient_id__in=ingredient_ids, recipe__user=user)
+        ranked = postings.values(
+            'recipe_id', 'recipe__ingredient_count'
+        ).annotate(
+            matched=Count('ingredient_id')
+        ).annotate(
+            missing=F('recipe__ingredient_count') - F('matched')
+        )
+        if max_missing is not None:
+            ranked = ranked.filter(missing__lte=max_missing)
+        return ranked.order_by('missing', '-matched', 'recipe_id').values(
+            'recipe_id', 'matched', 'missing'
+        )
+
+
+class Recipe(DirtyFieldsMixin, models.Model):
+    """Recipe owned by a user, linked to their tags and ingredients
+
+    `ingredient_count` mirrors the number of linked ingredients and is kept
+    current by signal receivers in core.signals.
+    """
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    title = models.CharField(max_length=255)
+    time_minutes = models.IntegerField()
+    price = models.DecimalField(max_digits=5, decimal_places=2)
+    link = models.CharField(max_length=255, blank=True)
+    ingredients = models.ManyToManyField('Ingredient')
+    tags = models.ManyToManyField('Tag')
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeManager()
+
+    def __str__(self):
+        return self.title
+
+
+class CollectionVersionManager(models.Manager):
+    # Keeps user_id IN (...) lists under SQLite's parameter limit.
+    chunk_size = 500
+
+    def current(self, user, kinds):
+        """Return the (version, updated_at) of each of the user's collections
+
+        A collection that was never written is (0, None). One query reads
+        all of them through the (user, kind) unique index.
+        """
+        rows = {
+            kind: (version, updated_at)
+            for kind, version, updated_at in self.filter(
+                user=user, kind__in=kinds
+            ).values_list('kind', 'version', 'updated_at')
+        }
+        return tuple(rows.get(kind, (0, None)) for kind in kinds)
+
+    def bump(self, kind, user_ids):
+        """Advance the version of each user's collection of this kind
+
+        Existing rows are incremented with one UPDATE per chunk; rows for
+        users whose collection was never written are inserted, and if a
+        concurrent writer inserts them first the bump is retried.
+        """
+        user_ids = sorted(set(user_ids))
+        now = timezone.now()
+        for start in range(0, len(user_ids), self.chunk_size):
+            chunk = user_ids[start:start + self.chunk_size]
+            rows = self.filter(kind=kind, user_id__in=chunk)
+            if rows.update(version=F('version') + 1, updated_at=now) \
+                    == len(chunk):
+                continue
+            missing = set(chunk).difference(
+                rows.values_list('user_id', flat=True)
+            )
+            try:
+                with transaction.atomic(using=self.db):
+                    self.bulk_create(
+                        self.model(user_id=user_id, kind=kind, version=1,
+                                   updated_at=now)
+                        for user_id in missing
+                    )
+            except IntegrityError:
+                self.bump(kind, missing)
+
+
+class CollectionVersion(models.Model):
+    """Change counter for one of a user's collections, such as their tags
+
+    core.signals bumps it in the same transaction as every write that
+    changes what the collection lists, so views can derive validators
+    from a single indexed lookup. Writers that skip signals, like bulk
+    inserts and COPY, call bump() themselves.
+
+    Bumps can run while the user is being deleted, so the user foreign key
+    has no database constraint; core.signals drops the rows afterwards.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+'
+    )
+    kind = models.CharField(max_length=32)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    objects = CollectionVersionManager()
+
+    class Meta:
+        unique_together = (('user', 'kind'),)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return '%s %s v%d' % (self.user_id, self.kind, self.version)
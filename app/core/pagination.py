@@ -0,0 +1,128 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination seeking on the view's `keyset_ordering` columns
+
+    Pages are fetched with `WHERE a >= x AND (a > x OR (a = x AND b > y))
+    ORDER BY a, b LIMIT n`, the expanded form of `(a, b) > (x, y)`. The
+    leading bound lets an index on (a, b) start its range scan at the
+    cursor, so there is no OFFSET and no COUNT(*). The ordering must
+    end in a unique column (normally the id) and all columns must share a
+    direction. Pagination is opt-in: without a `cursor` or `page_size`
+    parameter the full list is returned as before.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and \
+                self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.ordering = tuple(view.keyset_ordering)
+        self.limit = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(
+            params.get(self.cursor_query_param), queryset
+        )
+        if position is not None:
+            queryset = queryset.filter(self.seek(position))
+
+        rows = list(queryset[:self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_position = self.position(rows[-1]) \
+            if self.has_next else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def seek(self, position):
+        """Build the filter selecting rows strictly after position"""
+        descending = self.ordering[0].startswith('-')
+        fields = [f.lstrip('-') for f in self.ordering]
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        for i, field in enumerate(fields):
+            equal = {fields[j]: position[j] for j in range(i)}
+            equal['%s__%s' % (field, lookup)] = position[i]
+            condition |= Q(**equal)
+        if len(fields) > 1:
+            bound = '%s__%se' % (fields[0], lookup)
+            condition = Q(**{bound: position[0]}) & condition
+        return condition
+
+    def position(self, row):
+        fields = [f.lstrip('-') for f in self.ordering]
+        if isinstance(row, dict):
+            return [row[f] for f in fields]
+        return [getattr(row, f) for f in fields]
+
+    def encode_cursor(self, position):
+        data = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def decode_cursor(self, cursor, queryset):
+        """Decode a cursor into values of the ordering columns' types"""
+        if not cursor:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(position, list) or \
+                    len(position) != len(self.ordering):
+                raise ValueError(cursor)
+            return [
+                self.to_python(queryset, name.lstrip('-'), value)
+                for name, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, queryset, name, value):
+        if value is None or isinstance(value, (dict, list)):
+            raise ValueError(value)
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            field = queryset.query.annotations[name].output_field
+        return field.to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+        return replace_query_param(url, self.page_size_query_param, self.limit)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
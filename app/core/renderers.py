@@ -0,0 +1,44 @@
+import itertools
+
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+
+from core.export import buffered
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    """JSONRenderer that can also encode a list lazily, in batches of rows
+
+    iter_render() yields exactly the bytes render() produces for the same
+    list without an indent, coalesced into chunks of about `chunk_size`
+    bytes. Only `batch_size` rows and one chunk are held at a time; rows
+    are encoded a batch per call because per-row encoder calls dominate
+    the cost for small rows.
+    """
+    batch_size = 500
+    chunk_size = 64 * 1024
+
+    def iter_render(self, rows):
+        separators = SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+        encode = self.encoder_class(
+            ensure_ascii=self.ensure_ascii, allow_nan=not self.strict,
+            separators=separators
+        ).encode
+        return buffered(self._encode_rows(rows, encode, separators[0]),
+                        self.chunk_size)
+
+    def _encode_rows(self, rows, encode, item_separator):
+        yield b'['
+        prefix = ''
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            # Strip the batch's own brackets; escape as render() does.
+            text = encode(batch)[1:-1].replace(
+                '\u2028', '\\u2028'
+            ).replace('\u2029', '\\u2029')
+            yield (prefix + text).encode('utf-8')
+            prefix = item_separator
+        yield b']'
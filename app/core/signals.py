@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, \
+    post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core import authentication
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Stop serving a deleted token from the authentication cache"""
+    authentication.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    """Any saved change (is_active, password, profile) evicts the user"""
+    authentication.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    """Drop the collection versions, which have no cascading constraint"""
+    CollectionVersion.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def collection_changed(sender, instance, **kwargs):
+    """Bump the version of the collection the row is listed in"""
+    CollectionVersion.objects.bump(sender._meta.model_name, [instance.user_id])
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Keep Recipe.ingredient_count in step with the link table
+
+    Counts are recomputed for the affected recipes rather than adjusted by
+    len(pk_set), which also lists ids that were never linked.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.refresh_ingredient_counts([instance.pk])
+        return
+
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        Recipe.objects.refresh_ingredient_counts(
+            instance.__dict__.pop('_cleared_recipe_ids', [])
+        )
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.refresh_ingredient_counts(pk_set)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, **kwargs):
+    """Remember which recipes lose a link when the ingredient goes"""
+    instance._linked_recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    linked = instance.__dict__.pop('_linked_recipe_ids', None)
+    if linked:
+        Recipe.objects.refresh_ingredient_counts(linked)
+
+
+def adjust_usage(model, user_id, ids, delta):
+    """Add delta to the usage_count of the user's rows in one UPDATE"""
+    if ids and delta:
+        model.objects.filter(pk__in=ids).update(
+            usage_count=F('usage_count') + delta
+        )
+        CollectionVersion.objects.bump(model._meta.model_name, [user_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Keep Tag and Ingredient usage_count in step with recipe links
+
+    Additions use pk_set, which Django has already stripped of existing
+    links. Removals first look up which of the ids are really linked, as
+    remove() and clear() report ids regardless.
+    """
+    model = Tag if sender is Recipe.tags.through else Ingredient
+    column = model._meta.model_name + '_id'
+    pending = instance.__dict__.setdefault('_usage_pending', {})
+
+    if action in ('pre_remove', 'pre_clear'):
+        if reverse:
+            links = sender.objects.filter(**{column: instance.pk})
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+            pending[sender] = links.count()
+        else:
+            links = sender.objects.filter(recipe_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(**{column + '__in': pk_set})
+            pending[sender] = list(links.values_list(column, flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        removed = pending.pop(sender, None)
+        if reverse:
+            adjust_usage(model, instance.user_id, [instance.pk],
+                         -(removed or 0))
+        else:
+            adjust_usage(model, instance.user_id, removed, -1)
+    elif action == 'post_add':
+        if reverse:
+            adjust_usage(model, instance.user_id, [instance.pk], len(pk_set))
+        else:
+            adjust_usage(model, instance.user_id, pk_set, 1)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """Release the recipe's links, which cascade without m2m signals"""
+    for through, model in ((Recipe.tags.through, Tag),
+                           (Recipe.ingredients.through, Ingredient)):
+        column = model._meta.model_name + '_id'
+        adjust_usage(model, instance.user_id, list(through.objects.filter(
+            recipe_id=instance.pk
+        ).values_list(column, flat=True)), -1)
@@ -0,0 +1,159 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import TokenUserCache, token_cache, \
+    user_from_state, user_state
+from core.lru import LRUCache
+from user.services import UserSerializer
+
+
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class LRUCacheTests(TestCase):
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is dropped when full"""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        """Test entries are not returned once their ttl has passed"""
+        now = [100.0]
+        cache = LRUCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.set('a', 1)
+        now[0] += 11
+
+        self.assertIsNone(cache.get('a'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='cache@tessel.tech',
+            password='ssshhh123',
+            name='cached',
+        )
+        self.token = Token.objects.create(user=self.user)
+        # Creating the user marked it as just invalidated
+        token_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_token_lookup_is_cached(self):
+        """Test the second request resolves the token without a query"""
+        self.client.get(TAGS_URL)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any('authtoken_token' in q['sql'] for q in ctx.captured_queries)
+        )
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating immediately"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user evicts their cached token"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_evicts_user(self):
+        """Test a password change through the serializer refreshes cache"""
+        self.client.get(ME_URL)
+        serializer = UserSerializer(
+            self.user, data={'name': 'renamed', 'password': 'newpass123'},
+            partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'renamed')
+        self.assertTrue(
+            any('authtoken_token' in q['sql'] for q in ctx.captured_queries)
+        )
+
+    def test_local_entries_use_local_ttl(self):
+        """Test workers without a shared cache keep entries only briefly"""
+        cache = TokenUserCache({'TTL': 300, 'LOCAL_TTL': 5})
+
+        self.assertIsNone(cache.shared)
+        self.assertEqual(cache.local.ttl, 5)
+        self.assertEqual(cache.local_keys.ttl, 5)
+
+    def test_cached_user_saves_every_field(self):
+        """Test a user rebuilt from the cache is not assumed to be saved"""
+        state = user_state(self.user)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            name='changed elsewhere'
+        )
+        user = user_from_state(state)
+
+        user.name = 'cached'
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'cached')
+
+    def test_shared_entries_leave_out_password(self):
+        """Test the shared cache never holds the password hash"""
+        shared = TokenUserCache({'CACHE_ALIAS': 'default'})
+        self.addCleanup(cache.clear)
+        shared.set_user(self.token.key, self.user)
+
+        field_names, values = cache.get(shared._token_key(self.token.key))
+        user = shared.get_user(self.token.key)
+
+        self.assertNotIn('password', field_names)
+        self.assertNotIn(self.user.password, values)
+        self.assertEqual(user.email, self.user.email)
+        self.assertTrue(user.check_password('ssshhh123'))
+
+    def test_stale_user_not_written_back(self):
+        """Test a user read before an invalidation is not cached after it"""
+        shared = TokenUserCache({'CACHE_ALIAS': 'default'})
+        self.addCleanup(cache.clear)
+        local = TokenUserCache()
+        stale = get_user_model().objects.get(pk=self.user.pk)
+
+        for tokens in (shared, local):
+            tokens.set_user(self.token.key, stale)
+            tokens.invalidate_user(self.user.pk)
+            tokens.set_user(self.token.key, stale)
+
+            self.assertIsNone(tokens.get_user(self.token.key))
+        self.assertIsNone(TokenUserCache(
+            {'CACHE_ALIAS': 'default'}
+        ).get_user(self.token.key))
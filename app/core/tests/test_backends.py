@@ -0,0 +1,44 @@
+from django.contrib.auth import authenticate, get_user_model
+from django.db import IntegrityError
+from django.test import TestCase
+
+
+class CanonicalEmailBackendTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'Vivek.Test@tessel.tech', 'testpass'
+        )
+
+    def test_login_ignores_case_in_one_query(self):
+        """Test any casing of the email resolves with a single lookup"""
+        with self.assertNumQueries(1):
+            user = authenticate(
+                username='VIVEK.test@Tessel.Tech', password='testpass'
+            )
+
+        self.assertEqual(user, self.user)
+
+    def test_login_rejects_wrong_password(self):
+        """Test a known email with a bad password does not authenticate"""
+        self.assertIsNone(
+            authenticate(username='vivek.test@tessel.tech', password='nope')
+        )
+        self.assertIsNone(
+            authenticate(username='nobody@tessel.tech', password='testpass')
+        )
+
+    def test_case_variants_are_duplicates(self):
+        """Test emails differing only by case cannot both be stored"""
+        with self.assertRaises(IntegrityError):
+            get_user_model().objects.create_user(
+                'vivek.test@tessel.tech', 'testpass'
+            )
+
+    def test_canonical_follows_email_update(self):
+        """Test saving a changed email updates its canonical form"""
+        self.user.email = 'New@Tessel.tech'
+        self.user.save(update_fields=['email'])
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email_canonical, 'new@tessel.tech')
@@ -0,0 +1,58 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.cache import ResponseCache
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cache = ResponseCache({'WAIT': 0.1, 'POLL_INTERVAL': 0.01})
+        self.renders = []
+
+    def render(self):
+        self.renders.append(1)
+        return 'body %d' % len(self.renders)
+
+    def test_entry_rendered_once(self):
+        """Test a cached entry is served without rendering again"""
+        first = self.cache.get_or_render('k', self.render)
+        second = self.cache.get_or_render('k', self.render)
+
+        self.assertEqual((first, second), ('body 1', 'body 1'))
+        self.assertEqual(len(self.renders), 1)
+        self.assertIsNone(cache.get('listcache:k:lock'))
+
+    def test_waits_for_render_in_flight(self):
+        """Test a miss during another caller's render reuses its result"""
+        cache.add('listcache:k:lock', 1)
+
+        def finish(delay):
+            cache.set('listcache:k', 'from other worker')
+
+        with patch('core.cache.time.sleep', side_effect=finish):
+            entry = self.cache.get_or_render('k', self.render)
+
+        self.assertEqual(entry, 'from other worker')
+        self.assertEqual(self.renders, [])
+
+    def test_renders_after_waiting_too_long(self):
+        """Test a stuck render does not block callers past WAIT"""
+        cache.add('listcache:k:lock', 1)
+
+        entry = self.cache.get_or_render('k', self.render)
+
+        self.assertEqual(entry, 'body 1')
+        self.assertIsNone(cache.get('listcache:k'))
+
+    def test_disabled_without_alias(self):
+        """Test an empty CACHE_ALIAS renders every time"""
+        disabled = ResponseCache({'CACHE_ALIAS': ''})
+
+        disabled.get_or_render('k', self.render)
+        disabled.get_or_render('k', self.render)
+
+        self.assertEqual(len(self.renders), 2)
@@ -1,22 +1,246 @@
+import json
+import os
+import tempfile
+
+from io import StringIO
+
 from django.test import TestCase
+from unittest import skipUnless
 from unittest.mock import patch
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
 
+from core.models import Tag, Ingredient, Recipe
+
+
+ENSURE_CONNECTION = \
+    'django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection'
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_when_up(self):
         """Test waiting for DB when DB is up and running"""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.return_value = True
-            call_command("wait_for_db")
-            self.assertEquals(gi.call_count, 1)
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.return_value = None
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEquals(ec.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for DB until DB is up"""
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEquals(gi.call_count, 6)
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEquals(ec.call_count, 6)
+            self.assertEquals(ts.call_count, 5)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff_grows(self, ts):
+        """Test retry delays stay within the jittered exponential bound"""
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 4 + [None]
+            call_command(
+                "wait_for_db", base_delay=0.1, max_delay=0.5,
+                stdout=StringIO()
+            )
+        delays = [c[0][0] for c in ts.call_args_list]
+        for attempt, delay in enumerate(delays, start=1):
+            self.assertLessEqual(delay, min(0.5, 0.1 * 2 ** attempt))
+
+    def test_wait_for_db_timeout(self):
+        """Test the command fails once the timeout is exhausted"""
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command(
+                    "wait_for_db", timeout=0,
+                    stdout=StringIO(), stderr=StringIO()
+                )
+
+    def test_export_user_data(self):
+        """Test exporting a user's data to an NDJSON file"""
+        user = get_user_model().objects.create_user('e@x.com', 'testpass')
+        Tag.objects.create(user=user, name='Vegan')
+        Ingredient.objects.create(user=user, name='kale')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'export.ndjson')
+            call_command('export_user_data', 'e@x.com', output=path)
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertEqual(
+            [(r['type'], r['name']) for r in lines],
+            [('tag', 'Vegan'), ('ingredient', 'kale')]
+        )
+
+    def test_import_catalog_dedupes(self):
+        """Test importing a catalog skips rows already known for the user"""
+        user = get_user_model().objects.create_user('i@x.com', 'testpass')
+        Ingredient.objects.create(user=user, name='salt')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'catalog.csv')
+            with open(path, 'w') as f:
+                f.write('name\nsalt\nkale\nKale\npepper\nSALT\n')
+            call_command(
+                'import_catalog', path, email='i@x.com', batch_size=2,
+                stdout=StringIO()
+            )
+
+        names = Ingredient.objects.filter(user=user).values_list(
+            'name', flat=True
+        )
+        self.assertCountEqual(names, ['salt', 'kale', 'pepper'])
+
+    def test_import_catalog_bad_rows(self):
+        """Test malformed input rows fail with their line number"""
+        get_user_model().objects.create_user('i@x.com', 'testpass')
+        cases = [
+            ('catalog.ndjson', '{"name": "kale"}\n{"name": \n',
+             'Line 2: invalid JSON'),
+            ('catalog.ndjson', '\n["kale"]\n', 'Line 2: expected'),
+            ('catalog.csv', 'name,user_id\nkale,\nsalt,abc\n',
+             "Line 3: invalid user_id 'abc'"),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for filename, content, message in cases:
+                path = os.path.join(tmp, filename)
+                with open(path, 'w') as f:
+                    f.write(content)
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command(
+                        'import_catalog', path, email='i@x.com',
+                        stdout=StringIO()
+                    )
+
+        self.assertFalse(Ingredient.objects.exists())
+
+    def test_name_storage_report(self):
+        """Test the report counts rows per distinct name"""
+        for email in ('a@x.com', 'b@x.com'):
+            user = get_user_model().objects.create_user(email, 'testpass')
+            Ingredient.objects.create(user=user, name='extra virgin olive oil')
+        out = StringIO()
+
+        call_command('name_storage_report', stdout=out)
+
+        self.assertIn(
+            '2 rows reference 1 distinct names (2.0 per name)',
+            out.getvalue()
+        )
+        self.assertRegex(out.getvalue(), r'core_ingredient +\S+ \w?B +\S')
+
+    def test_rebuild_usage_counts(self):
+        """Test drifted usage counters are reported, then repaired"""
+        user = get_user_model().objects.create_user('u@x.com', 'testpass')
+        tag = Tag.objects.create(user=user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=user, title='Salad', time_minutes=5, price=1
+        )
+        recipe.tags.add(tag)
+        Tag.objects.filter(pk=tag.pk).update(usage_count=7)
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_usage_counts', verify=True, stdout=StringIO()
+            )
+        call_command('rebuild_usage_counts', batch_size=1, stdout=StringIO())
+        call_command('rebuild_usage_counts', verify=True, stdout=StringIO())
+
+        self.assertEqual(Tag.objects.get(pk=tag.pk).usage_count, 1)
+
+    def test_benchmark_api_baseline(self):
+        """Test the benchmark saves a baseline and flags regressions"""
+        options = dict(
+            users=2, rows=3, requests=4, concurrency=1,
+            scenario=['tag_list', 'me_retrieve'], stdout=StringIO()
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            call_command('benchmark_api', save_baseline=path, **options)
+            with open(path) as f:
+                baseline = json.load(f)
+            self.assertEqual(baseline['results']['tag_list']['errors'], 0)
+
+            baseline['results']['tag_list']['queries_per_request'] = 0
+            with open(path, 'w') as f:
+                json.dump(baseline, f)
+            with self.assertRaises(CommandError):
+                call_command('benchmark_api', baseline=path, **options)
+
+        self.assertFalse(get_user_model().objects.filter(
+            email__endswith='@bench.invalid'
+        ).exists())
+
+    def test_seed_data_is_deterministic_and_skewed(self):
+        """Test seeding creates skewed per user data from a fixed seed"""
+        options = dict(
+            users=20, tags_per_user=5, ingredients_per_user=10, seed=7,
+            stdout=StringIO()
+        )
+        call_command('seed_data', **options)
+        first = list(Ingredient.objects.order_by('id').values_list(
+            'user__email', 'name'
+        ))
+        call_command('seed_data', clear=True, **options)
+        second = list(Ingredient.objects.order_by('id').values_list(
+            'user__email', 'name'
+        ))
+
+        self.assertEqual(first, second)
+        users = get_user_model().objects.filter(
+            email__endswith='@seed.invalid'
+        )
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(len({u.password for u in users}), 1)
+        heaviest = max(
+            Ingredient.objects.filter(user=u).count() for u in users
+        )
+        self.assertGreater(heaviest, 10 * 3)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class PostgreSQLCommandTests(TestCase):
+    """Raw INSERT and COPY paths that only run on PostgreSQL"""
+
+    def test_get_or_create_by_name_raw_insert(self):
+        """Test the ON CONFLICT insert fills every NOT NULL column"""
+        user = get_user_model().objects.create_user('p@x.com', 'testpass')
+
+        tag, created = Tag.objects.get_or_create_by_name(user, 'Vegan')
+
+        self.assertTrue(created)
+        self.assertEqual(Tag.objects.get(pk=tag.pk).usage_count, 0)
+
+    def test_import_catalog_copy(self):
+        """Test the COPY import inserts rows with a zero usage count"""
+        get_user_model().objects.create_user('c@x.com', 'testpass')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'catalog.csv')
+            with open(path, 'w') as f:
+                f.write('name\nsalt\nkale\n')
+            call_command(
+                'import_catalog', path, email='c@x.com', stdout=StringIO()
+            )
+
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('name', 'usage_count')),
+            [('kale', 0), ('salt', 0)]
+        )
+
+    def test_seed_data_copy(self):
+        """Test seeding through COPY inserts rows with a zero usage count"""
+        call_command(
+            'seed_data', users=3, tags_per_user=2, ingredients_per_user=2,
+            stdout=StringIO()
+        )
+
+        self.assertTrue(Tag.objects.exists())
+        self.assertFalse(Tag.objects.exclude(usage_count=0).exists())
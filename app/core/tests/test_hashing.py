@@ -0,0 +1,78 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashing import HashingBusy, HashingExecutor
+
+
+TOKEN_URL = reverse('user:token')
+
+
+class HashingExecutorTests(TestCase):
+
+    def test_runs_function_and_records_stats(self):
+        """Test the executor returns results and counts completions"""
+        executor = HashingExecutor(workers=1, queue_size=0)
+
+        self.assertEqual(executor.run(sum, [1, 2, 3]), 6)
+        self.assertEqual(executor.stats()['completed'], 1)
+
+    def test_full_queue_fails_fast(self):
+        """Test submissions beyond workers + queue are rejected"""
+        executor = HashingExecutor(workers=1, queue_size=0)
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        worker = threading.Thread(target=executor.run, args=(block,))
+        worker.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(HashingBusy):
+                executor.run(sum, [1])
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual(executor.stats()['rejected'], 1)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1234)
+    def test_iterations_follow_settings(self):
+        """Test the pooled hasher uses the configured iteration count"""
+        encoded = get_hasher().encode('secret', 'salt')
+
+        self.assertEqual(encoded.split('$')[1], '1234')
+
+    def test_login_returns_503_when_busy(self):
+        """Test a saturated hashing pool surfaces as 503 on login"""
+        payload = {'email': 'busy@tessel.tech', 'password': 'ssshhh123'}
+        get_user_model().objects.create_user(**payload)
+
+        with patch('core.hashing.HashingExecutor.run',
+                   side_effect=HashingBusy):
+            res = APIClient().post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', res)
+
+    def test_admin_login_returns_503_when_busy(self):
+        """Test the busy pool is a 503 outside DRF views too"""
+        payload = {'email': 'busy@tessel.tech', 'password': 'ssshhh123'}
+        get_user_model().objects.create_superuser(**payload)
+
+        with patch('core.hashing.HashingExecutor.run',
+                   side_effect=HashingBusy):
+            res = self.client.post(reverse('admin:login'), {
+                'username': payload['email'], 'password': payload['password']
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.metrics import QueryRecorder, registry
+
+
+METRICS_URL = reverse('metrics')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'metrics@tessel.tech', 'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_query_recorder_counts_repeats(self):
+        """Test identical statements beyond the first count as repeats"""
+        recorder = QueryRecorder()
+        execute = lambda sql, params, many, context: None  # noqa: E731
+        for sql in ['SELECT 1', 'SELECT 2', 'SELECT 1', 'SELECT 1']:
+            recorder(execute, sql, None, False, {})
+
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.repeated, 2)
+
+    @override_settings(INTERNAL_IPS=['127.0.0.1'])
+    def test_requests_recorded_per_view(self):
+        """Test latency and query counts are exposed for the view"""
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        body = self.client.get(METRICS_URL).content.decode()
+
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{view="recipe:tag-list",method="GET"} 2', body
+        )
+        self.assertIn(
+            'db_queries_total{view="recipe:tag-list",method="GET"} 3', body
+        )
+
+    @override_settings(METRICS={'SERVER_TIMING': True, 'TOKEN': ''})
+    def test_server_timing_header(self):
+        res = self.client.get(TAGS_URL)
+
+        self.assertIn('db;dur=', res['Server-Timing'])
+        self.assertIn('2 queries', res['Server-Timing'])
+
+    @override_settings(METRICS={'SERVER_TIMING': False, 'TOKEN': 'secret'})
+    def test_metrics_token_required(self):
+        """Test scraping needs the bearer token when one is configured"""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(METRICS={'SERVER_TIMING': False, 'TOKEN': ''},
+                       INTERNAL_IPS=[])
+    def test_metrics_private_without_token(self):
+        """Test only staff may scrape when no token is configured"""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        staff = get_user_model().objects.create_superuser(
+            'staff@tessel.tech', 'testpass'
+        )
+        self.client.force_login(staff)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(METRICS={'SERVER_TIMING': False, 'TOKEN': ''},
+                       INTERNAL_IPS=['127.0.0.1'])
+    def test_metrics_open_to_internal_ips(self):
+        """Test internal addresses may scrape without a token"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
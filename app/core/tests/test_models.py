@@ -1,4 +1,6 @@
-from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from .. import models
 
@@ -69,3 +71,126 @@ class ModelTests(TestCase):
         )
 
         self.assertEqual(str(ingredient), ingredient.name)
+
+    def test_tag_name_unique_per_user_ignoring_case(self):
+        """Test the database rejects a second tag differing only in case"""
+        user = sample_user_create()
+        models.Tag.objects.create(user=user, name='Vegan')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Tag.objects.create(user=user, name='vegan')
+        models.Tag.objects.create(
+            user=sample_user_create(email='other@tesla.com'), name='vegan'
+        )
+
+    def test_get_or_create_by_name(self):
+        """Test get_or_create_by_name reuses a row matching in any case"""
+        user = sample_user_create()
+
+        created = models.Ingredient.objects.get_or_create_by_name(
+            user, 'Salt'
+        )
+        existing = models.Ingredient.objects.get_or_create_by_name(
+            user, 'SALT'
+        )
+
+        self.assertTrue(created[1])
+        self.assertEqual(existing, (created[0], False))
+        self.assertEqual(existing[0].name, 'Salt')
+
+    def test_name_whose_lowercase_is_longer(self):
+        """Test a 255 character name keeps its longer lowercase key"""
+        user = sample_user_create()
+        name = '\u0130' * 255
+
+        tag = models.Tag.objects.create(user=user, name=name)
+
+        self.assertEqual(len(tag.name_key.text), 510)
+        self.assertEqual(tag.sort_name, name)
+
+    def test_names_shared_between_users(self):
+        """Test equal names from different users share one Name row"""
+        tags = [
+            models.Tag.objects.create(
+                user=sample_user_create(email=email), name='Vegan'
+            )
+            for email in ('one@tesla.com', 'two@tesla.com')
+        ]
+
+        self.assertEqual(tags[0].name_ref_id, tags[1].name_ref_id)
+        self.assertEqual(
+            models.Name.objects.filter(text__iexact='vegan').count(), 2
+        )
+
+    def test_rename_tag(self):
+        """Test renaming a tag points it at the new name"""
+        tag = models.Tag.objects.create(user=sample_user_create(), name='Hot')
+
+        tag.name = 'Spicy'
+        tag.save()
+
+        tag = models.Tag.objects.get(pk=tag.pk)
+        self.assertEqual(tag.name, 'Spicy')
+        self.assertEqual(tag.name_key.text, 'spicy')
+
+    def test_recipe_str(self):
+        """Test the recipe string representation"""
+        recipe = models.Recipe.objects.create(
+            user=sample_user_create(),
+            title='Steak and mushroom sauce',
+            time_minutes=5,
+            price=5.00
+        )
+
+        self.assertEqual(str(recipe), recipe.title)
+
+    def test_save_writes_only_changed_fields(self):
+        """Test saves skip unchanged rows and never write stale counters"""
+        user = sample_user_create()
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        stale = models.Tag.objects.get(pk=tag.pk)
+        models.Tag.objects.filter(pk=tag.pk).update(usage_count=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            stale.save()
+        self.assertFalse(
+            [q for q in queries if q['sql'].startswith('UPDATE')]
+        )
+        stale.name = 'Vegetarian'
+        stale.save()
+
+        tag.refresh_from_db()
+        self.assertEqual((tag.name, tag.usage_count), ('Vegetarian', 3))
+        self.assertEqual(tag.get_dirty_fields(), [])
+
+    def test_collection_version_bumped_and_dropped(self):
+        """Test tag writes bump the version and user deletion removes it"""
+        user = sample_user_create()
+        versions = models.CollectionVersion.objects
+
+        self.assertEqual(versions.current(user, ['tag']), ((0, None),))
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        tag.delete()
+        (tags, _), (ingredients, _) = versions.current(
+            user, ['tag', 'ingredient']
+        )
+        self.assertEqual((tags, ingredients), (2, 0))
+
+        models.Tag.objects.create(user=user, name='Vegan')
+        user_id = user.pk
+        user.delete()
+        self.assertFalse(versions.filter(user_id=user_id).exists())
+
+
+class NameCacheTests(TransactionTestCase):
+
+    def tearDown(self):
+        # Flushing the tables invalidates every cached id.
+        models.name_cache.clear()
+
+    def test_intern_uses_cache_after_commit(self):
+        """Test interned ids are served from the cache once committed"""
+        ids = models.Name.objects.intern('Olive Oil')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(models.Name.objects.intern('Olive Oil'), ids)
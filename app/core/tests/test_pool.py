@@ -0,0 +1,121 @@
+import threading
+
+from django.test import SimpleTestCase
+from psycopg2.pool import PoolError
+
+from core.db.pool import ConnectionPool
+
+
+class StubConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.created = []
+
+    def factory(self):
+        conn = StubConnection()
+        self.created.append(conn)
+        return conn
+
+    def make_pool(self, **kwargs):
+        kwargs.setdefault('check', lambda conn: conn.healthy)
+        return ConnectionPool(self.factory, clock=self.clock, **kwargs)
+
+    def test_connections_are_reused(self):
+        """Test a returned connection is handed out again"""
+        pool = self.make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(len(self.created), 1)
+
+    def test_min_size_opened_up_front(self):
+        pool = self.make_pool(min_size=2)
+
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_exhausted_pool_times_out(self):
+        """Test checkout fails once max_size is in use and time runs out"""
+        pool = self.make_pool(max_size=1, timeout=0)
+        pool.getconn()
+
+        with self.assertRaises(PoolError):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        """Test a blocked checkout resumes when a connection comes back"""
+        pool = ConnectionPool(self.factory, max_size=1, timeout=5)
+        conn = pool.getconn()
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(
+            pool.getconn()
+        ))
+        waiter.start()
+        pool.putconn(conn)
+        waiter.join(5)
+
+        self.assertEqual(result, [conn])
+
+    def test_old_connections_retired(self):
+        """Test connections past max_lifetime are closed, not reused"""
+        pool = self.make_pool(max_lifetime=60)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.clock.now = 61
+
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertTrue(conn.closed)
+
+    def test_unhealthy_idle_connection_replaced(self):
+        """Test the health check runs on checkout after idling"""
+        pool = self.make_pool(check_idle_after=10)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.healthy = False
+        self.clock.now = 11
+
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_failed_reset_discards(self):
+        def reset(conn):
+            raise RuntimeError('broken')
+
+        pool = self.make_pool(reset=reset)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_stats(self):
+        pool = self.make_pool(max_size=3)
+        first = pool.getconn()
+        pool.getconn()
+        pool.putconn(first)
+
+        stats = pool.stats()
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['checkouts'], 2)
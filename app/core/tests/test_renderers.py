@@ -0,0 +1,32 @@
+import random
+
+from django.test import SimpleTestCase
+
+from core.renderers import StreamingJSONRenderer
+
+
+class StreamingJSONRendererTests(SimpleTestCase):
+
+    def test_empty_list(self):
+        """Test an empty iterable renders as an empty array"""
+        renderer = StreamingJSONRenderer()
+
+        self.assertEqual(b''.join(renderer.iter_render(iter([]))), b'[]')
+
+    def test_matches_render(self):
+        """Test streamed chunks join to exactly what render() returns"""
+        rng = random.Random(20)
+        alphabet = 'ab "\\/\n\u00e9\u2028\u2029\U0001f600'
+        rows = [
+            {'id': i, 'name': ''.join(rng.choice(alphabet)
+                                      for _ in range(rng.randint(0, 12)))}
+            for i in range(500)
+        ]
+        renderer = StreamingJSONRenderer()
+        renderer.batch_size = 7
+        renderer.chunk_size = 256
+
+        chunks = list(renderer.iter_render(iter(rows)))
+
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual(b''.join(chunks), renderer.render(rows))
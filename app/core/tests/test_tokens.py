@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import tokens
+from core.authentication import token_cache
+
+
+ME_URL = reverse('user:me')
+SIGNED_TOKEN_URL = reverse('user:token-signed')
+
+
+class SignedTokenTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='signed@tessel.tech',
+            password='ssshhh123',
+        )
+        self.client = APIClient()
+
+    def authorize(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+
+    def test_round_trip(self):
+        """Test a signed token yields the user id and version back"""
+        key = tokens.make_signed_token(self.user)
+
+        self.assertEqual(
+            tokens.read_signed_token(key),
+            (self.user.pk, self.user.token_version)
+        )
+
+    def test_tampered_token_rejected(self):
+        """Test changing the payload invalidates the signature"""
+        key = tokens.make_signed_token(self.user)
+        other = get_user_model()(pk=self.user.pk + 1, token_version=1)
+        forged = tokens.make_signed_token(other).split('.')[1]
+        parts = key.split('.')
+
+        with self.assertRaises(tokens.BadSignedToken):
+            tokens.read_signed_token('.'.join([parts[0], forged, parts[2]]))
+
+    def test_expired_token_rejected(self):
+        key = tokens.make_signed_token(self.user, lifetime=10, now=1000)
+
+        with self.assertRaises(tokens.BadSignedToken):
+            tokens.read_signed_token(key, now=1011)
+
+    def test_signed_token_authenticates(self):
+        """Test the API accepts signed tokens"""
+        self.authorize(tokens.make_signed_token(self.user))
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_opaque_token_still_authenticates(self):
+        """Test DB backed tokens keep working next to signed ones"""
+        self.authorize(Token.objects.create(user=self.user).key)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_revoked_token_rejected(self):
+        """Test bumping the token version revokes issued tokens"""
+        self.authorize(tokens.make_signed_token(self.user))
+        self.client.get(ME_URL)
+        self.user.revoke_tokens()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_tokens(self):
+        key = tokens.make_signed_token(self.user)
+        self.user.set_password('another123')
+        self.user.save()
+        self.authorize(key)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rehash_keeps_tokens(self):
+        """Test a hash upgraded at login keeps the token version"""
+        key = tokens.make_signed_token(self.user)
+        version = self.user.token_version
+        payload = {'email': self.user.email, 'password': 'ssshhh123'}
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=4321):
+            signed = self.client.post(SIGNED_TOKEN_URL, payload)
+            self.authorize(signed.data['token'])
+            res = self.client.get(ME_URL)
+
+        self.user.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user.password.split('$')[1], '4321')
+        self.assertEqual(self.user.token_version, version)
+        self.authorize(key)
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_200_OK
+        )
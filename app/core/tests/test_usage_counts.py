@@ -0,0 +1,92 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import Tag, Ingredient, Recipe
+
+
+class UsageCountTests(TestCase):
+    """Test usage counters follow every way recipe links change"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'count@tesla.com', 'testpass'
+        )
+
+    def recipe(self, title='Recipe'):
+        return Recipe.objects.create(
+            user=self.user, title=title, time_minutes=5, price=1
+        )
+
+    def assertCountsMatchLinks(self):
+        for model in (Tag, Ingredient):
+            rows = model.objects.annotate(
+                actual=model.objects.actual_usage()
+            ).values_list('name', 'usage_count', 'actual')
+            for name, stored, actual in rows:
+                self.assertEqual(stored, actual, name)
+
+    def test_add_remove_and_delete(self):
+        """Test counters move with add, remove, clear and recipe delete"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        first, second = self.recipe('First'), self.recipe('Second')
+
+        first.tags.add(tag)
+        tag.recipe_set.add(second)
+        first.tags.add(tag)
+        self.assertEqual(Tag.objects.get(pk=tag.pk).usage_count, 2)
+
+        other = Tag.objects.create(user=self.user, name='Hot')
+        first.tags.remove(other)
+        self.assertEqual(Tag.objects.get(pk=other.pk).usage_count, 0)
+
+        second.delete()
+        self.assertEqual(Tag.objects.get(pk=tag.pk).usage_count, 1)
+
+    def test_save_keeps_counter(self):
+        """Test saving a stale instance doesn't overwrite its counter"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe().tags.add(tag)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+
+        self.assertEqual(Tag.objects.get(pk=tag.pk).usage_count, 1)
+
+    def test_random_link_changes(self):
+        """Test counters agree with the link tables after random changes"""
+        rng = random.Random(19)
+        tags = [Tag.objects.create(user=self.user, name='Tag %d' % i)
+                for i in range(6)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name='Item %d' % i)
+            for i in range(8)
+        ]
+        recipes = [self.recipe('Recipe %d' % i) for i in range(15)]
+
+        for _ in range(150):
+            recipe = rng.choice(recipes)
+            relation, items = rng.choice((
+                ('tags', tags), ('ingredients', ingredients)
+            ))
+            manager = getattr(recipe, relation)
+            picked = rng.sample(items, rng.randint(1, 3))
+            op = rng.randrange(7)
+            if op == 0:
+                manager.add(*picked)
+            elif op == 1:
+                manager.remove(*picked)
+            elif op == 2:
+                manager.set(picked)
+            elif op == 3:
+                manager.clear()
+            elif op == 4:
+                picked[0].recipe_set.add(*rng.sample(recipes, 3))
+            elif op == 5:
+                picked[0].recipe_set.remove(*rng.sample(recipes, 3))
+            elif rng.random() < 0.1:
+                picked[0].recipe_set.clear()
+
+        recipes.pop().delete()
+        self.assertCountsMatchLinks()
@@ -0,0 +1,64 @@
+import base64
+import hashlib
+import hmac
+import time
+
+from django.conf import settings
+
+
+PREFIX = 's1.'
+
+
+class BadSignedToken(Exception):
+    """Raised when a signed token is malformed, forged or expired"""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _signing_key():
+    return hashlib.sha256(
+        b'core.tokens.signed' + settings.SECRET_KEY.encode()
+    ).digest()
+
+
+def _signature(payload):
+    return hmac.new(_signing_key(), payload, hashlib.sha256).digest()
+
+
+def is_signed_token(key):
+    return key.startswith(PREFIX)
+
+
+def make_signed_token(user, lifetime=None, now=None):
+    """Issue a time limited token carrying the user id and token version"""
+    if lifetime is None:
+        lifetime = settings.SIGNED_TOKEN['LIFETIME']
+    expires = int((time.time() if now is None else now) + lifetime)
+    payload = ('%d:%d:%d' % (user.pk, user.token_version, expires)).encode()
+    return PREFIX + _b64encode(payload) + '.' + _b64encode(
+        _signature(payload)
+    )
+
+
+def read_signed_token(key, now=None):
+    """Verify a signed token and return its (user_id, token_version)"""
+    try:
+        payload, signature = key[len(PREFIX):].split('.')
+        payload = _b64decode(payload)
+        signature = _b64decode(signature)
+        user_id, version, expires = (int(p) for p in payload.split(b':'))
+    except (ValueError, TypeError):
+        raise BadSignedToken('Malformed token')
+
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise BadSignedToken('Bad signature')
+    if expires <= (time.time() if now is None else now):
+        raise BadSignedToken('Token expired')
+
+    return user_id, version
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from core.metrics import registry
+
+
+def metrics(request):
+    """Expose request metrics in the Prometheus text format
+
+    Scrapers present METRICS['TOKEN'] as a bearer token. Without a token
+    configured only staff users and addresses in INTERNAL_IPS may read.
+    """
+    token = settings.METRICS['TOKEN']
+    if token:
+        allowed = constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer ' + token
+        )
+    else:
+        allowed = request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS \
+            or request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,28 @@
+from rest_framework.filters import BaseFilterBackend
+
+
+class NameFilter(BaseFilterBackend):
+    """Filter recipe attributes by name
+
+    `?name=` matches the whole name case-insensitively and `?search=`
+    matches a case-insensitive substring, or a prefix with `&match=prefix`.
+    `?name=` resolves through the unique lowercase name key; searches run
+    against the shared name table, whose UPPER(text) pattern and trigram
+    indexes serve them on PostgreSQL.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        name = params.get('name')
+        if name:
+            queryset = queryset.filter(name_key__text=name.lower())
+
+        search = params.get('search')
+        if search:
+            if params.get('match') == 'prefix':
+                queryset = queryset.filter(name__istartswith=search)
+            else:
+                queryset = queryset.filter(name__icontains=search)
+
+        return queryset
@@ -1,21 +1,162 @@
+from django.db import IntegrityError, connections, router, transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from core.models import Tag, Ingredient
+from core.models import Name, Tag, Ingredient, Recipe
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """Validates a list of objects and inserts them in one statement"""
+    max_items = 1000
+
+    def validate(self, attrs):
+        """Reject oversized payloads and collapse duplicate names"""
+        if len(attrs) > self.max_items:
+            msg = _('Ensure this list has no more than {max} items.')
+            raise serializers.ValidationError(
+                msg.format(max=self.max_items), code='max_length'
+            )
+
+        seen = set()
+        unique = []
+        for item in attrs:
+            key = item['name'].lower()
+            if key not in seen:
+                seen.add(key)
+                unique.append(item)
+        return unique
+
+    def create(self, validated_data):
+        """Insert the new rows with one bulk_create, reusing existing ones
+
+        Names are interned up front and items are matched to the user's
+        rows by their lowercase name key. If a concurrent request inserts
+        one of the names first, the unique index aborts the batch and the
+        items are resolved one at a time instead.
+        """
+        if not validated_data:
+            return []
+        model = self.child.Meta.model
+        manager = model.objects.db_manager(router.db_for_write(model))
+        user = validated_data[0]['user']
+        ids = Name.objects.db_manager(manager.db).intern_many(
+            [item['name'] for item in validated_data]
+        )
+        keys = [ids[item['name'].lower()] for item in validated_data]
+
+        found = {
+            obj.name_key_id: obj
+            for obj in manager.filter(user=user, name_key_id__in=keys)
+        }
+        new = [
+            model(name_ref_id=ids[item['name']], name_key_id=key, **item)
+            for key, item in zip(keys, validated_data) if key not in found
+        ]
+        try:
+            with transaction.atomic(using=manager.db):
+                self.insert(manager, new)
+        except IntegrityError:
+            new = []
+
+        found.update((obj.name_key_id, obj) for obj in new)
+        return [
+            found.get(key) or manager.get_or_create_by_name(
+                user, item['name']
+            )[0]
+            for key, item in zip(keys, validated_data)
+        ]
+
+    def insert(self, manager, objs):
+        if connections[manager.db].features.can_return_ids_from_bulk_insert:
+            manager.bulk_create(objs)
+            return
+        # Backends that can't return ids fall back to row inserts so the
+        # response still carries the new primary keys.
+        for obj in objs:
+            obj.save(using=manager.db)
 
 
 class TagSerializer(serializers.ModelSerializer):
     """A Tag Creation and Updation Service"""
+    name = serializers.CharField(max_length=255)
 
     class Meta:
         """Define model to be serialized and put any conditions here"""
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkCreateListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Serializer for an ingredient object"""
+    name = serializers.CharField(max_length=255)
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkCreateListSerializer
+
+
+class RecipeSerializer(serializers.ModelSerializer):
+    """Create and update recipes, linking tags and ingredients by id"""
+    tags = serializers.PrimaryKeyRelatedField(
+        many=True, queryset=Tag.objects.all()
+    )
+    ingredients = serializers.PrimaryKeyRelatedField(
+        many=True, queryset=Ingredient.objects.all()
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id', 'title', 'tags', 'ingredients', 'time_minutes', 'price',
+            'link',
+        )
+        read_only_fields = ('id',)
+
+    def get_fields(self):
+        """Only accept tags and ingredients owned by the requesting user"""
+        fields = super().get_fields()
+        request = self.context.get('request')
+        for name in ('tags', 'ingredients'):
+            field = fields[name]
+            if request is not None and not field.read_only:
+                relation = field.child_relation
+                relation.queryset = relation.queryset.filter(
+                    user=request.user
+                )
+        return fields
+
+
+class RecipeListSerializer(serializers.ModelSerializer):
+    """Lightweight recipe for list responses
+
+    Tags and ingredients come from prefetched id/name rows and the link is
+    left for the detail view.
+    """
+    tags = TagSerializer(many=True, read_only=True)
+    ingredients = IngredientSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id', 'title', 'tags', 'ingredients', 'time_minutes', 'price',
+        )
+        read_only_fields = fields
+
+
+class RecipeDetailSerializer(RecipeSerializer):
+    """Full recipe with its tags and ingredients nested"""
+    tags = TagSerializer(many=True, read_only=True)
+    ingredients = IngredientSerializer(many=True, read_only=True)
+
+
+class CookableRecipeSerializer(RecipeListSerializer):
+    """Recipe list entry with how well the pantry covers it"""
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + ('matched', 'missing')
+        read_only_fields = fields
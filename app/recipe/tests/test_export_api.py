@@ -0,0 +1,74 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+
+EXPORT_URL = reverse('recipe:export')
+
+
+def read_lines(res):
+    return [json.loads(line) for line in
+            b''.join(res.streaming_content).decode().splitlines()]
+
+
+class ExportApiTests(TestCase):
+    """Test the NDJSON export endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'export@londonappdev.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.kale = Ingredient.objects.create(user=self.user, name='kale')
+        self.salt = Ingredient.objects.create(user=self.user, name='salt')
+
+    def test_login_required(self):
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_all(self):
+        """Test every tag and ingredient is exported one per line"""
+        other = get_user_model().objects.create_user('o@x.com', 'testpass')
+        Tag.objects.create(user=other, name='Hidden')
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(read_lines(res), [
+            {'type': 'tag', 'id': self.tag.id, 'name': 'Vegan'},
+            {'type': 'ingredient', 'id': self.kale.id, 'name': 'kale'},
+            {'type': 'ingredient', 'id': self.salt.id, 'name': 'salt'},
+        ])
+
+    def test_export_resume(self):
+        """Test an export resumes after the given kind and id"""
+        res = self.client.get(
+            EXPORT_URL, {'after': 'ingredient:%d' % self.kale.id}
+        )
+
+        self.assertEqual([r['name'] for r in read_lines(res)], ['salt'])
+
+    def test_export_gzip(self):
+        res = self.client.get(EXPORT_URL, {'gzip': '1'})
+        body = gzip.decompress(b''.join(res.streaming_content))
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(len(body.splitlines()), 3)
+
+    def test_invalid_resume_token(self):
+        res = self.client.get(EXPORT_URL, {'after': 'recipe:1'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -5,7 +5,7 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Ingredient
+from core.models import Ingredient, Recipe
 
 from recipe.services import IngredientSerializer
 
@@ -81,4 +81,78 @@ class PrivateIngredientsAPITests(TestCase):
         payload = {'name': ''}
         res = self.client.post(INGREDIENTS_URL, payload)
 
-        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_ingredients_paginated(self):
+        """Test cursor pages follow the descending name order"""
+        for name in ['kale', 'salt', 'pepper']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {'page_size': 2})
+        first = [i['name'] for i in res.data['results']]
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(first, ['salt', 'pepper'])
+        self.assertEqual(res.data['results'][0]['name'], 'kale')
+        self.assertIsNone(res.data['next'])
+
+    def test_bulk_create_ingredients(self):
+        """Test creating several ingredients with one request"""
+        payload = [{'name': 'Cabbage'}, {'name': 'Salt'}]
+        res = self.client.post(INGREDIENTS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        names = Ingredient.objects.filter(
+            user=self.user
+        ).values_list('name', flat=True)
+        self.assertCountEqual(names, ['Cabbage', 'Salt'])
+
+    def test_filter_ingredients_by_name(self):
+        """Test ?name= matches whole names ignoring case"""
+        Ingredient.objects.create(user=self.user, name='Olive Oil')
+        Ingredient.objects.create(user=self.user, name='Olive')
+
+        res = self.client.get(INGREDIENTS_URL, {'name': 'olive oil'})
+
+        self.assertEqual([i['name'] for i in res.data], ['Olive Oil'])
+
+    def test_search_ingredients(self):
+        """Test ?search= matches substrings, or prefixes on request"""
+        for name in ['Olive Oil', 'Black Olive', 'Salt']:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {'search': 'oliv'})
+        prefix = self.client.get(
+            INGREDIENTS_URL, {'search': 'oliv', 'match': 'prefix'}
+        )
+
+        self.assertEqual(
+            [i['name'] for i in res.data], ['Olive Oil', 'Black Olive']
+        )
+        self.assertEqual([i['name'] for i in prefix.data], ['Olive Oil'])
+
+    def test_order_ingredients_by_usage(self):
+        """Test ?ordering=-usage lists the most used ingredients first"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        kale = Ingredient.objects.create(user=self.user, name='Kale')
+        Recipe.objects.create(
+            user=self.user, title='Chips', time_minutes=1, price=1
+        ).ingredients.add(salt)
+
+        res = self.client.get(INGREDIENTS_URL, {'ordering': '-usage'})
+
+        self.assertEqual([i['id'] for i in res.data], [salt.id, kale.id])
+
+    def test_bulk_create_changes_etag(self):
+        """Test a bulk insert, which sends no signals, changes the ETag"""
+        etag = self.client.get(INGREDIENTS_URL)['ETag']
+        self.client.post(
+            INGREDIENTS_URL, [{'name': 'Cabbage'}, {'name': 'Salt'}],
+            format='json'
+        )
+
+        res = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
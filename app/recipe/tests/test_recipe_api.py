@@ -0,0 +1,306 @@
+import json
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.services import RecipeDetailSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+COOKABLE_URL = reverse('recipe:recipe-cookable')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PublicRecipeApiTests(TestCase):
+    """Test unauthenticated recipe API access"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeApiTests(TestCase):
+    """Test authenticated recipe API access"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@tesla.com', 'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_retrieve_recipes(self):
+        """Test retrieving a list of recipes with their tags"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        sample_recipe(self.user, title='Second')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['title'] for r in res.data],
+                         ['Second', 'Sample recipe'])
+        self.assertEqual(
+            res.data[1]['tags'], [{'id': recipe.tags.get().id,
+                                   'name': 'Vegan'}]
+        )
+        self.assertNotIn('link', res.data[0])
+
+    def test_cached_list_follows_tag_rename(self):
+        """Test renaming a tag invalidates cached recipe lists"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        sample_recipe(self.user).tags.add(tag)
+        self.client.get(RECIPES_URL)
+        cached = self.client.get(RECIPES_URL)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            json.loads(cached.content)[0]['tags'][0]['name'], 'Vegan'
+        )
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'Vegetarian')
+
+    def test_recipes_limited_to_user(self):
+        """Test retrieving recipes for the authenticated user only"""
+        other = get_user_model().objects.create_user(
+            'other@tesla.com', 'testpass'
+        )
+        sample_recipe(other)
+        sample_recipe(self.user, title='Mine')
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual([r['title'] for r in res.data], ['Mine'])
+
+    def test_view_recipe_detail(self):
+        """Test viewing a recipe detail"""
+        recipe = sample_recipe(self.user, link='https://example.com')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Kale')
+        )
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+    def test_create_recipe_with_tags_and_ingredients(self):
+        """Test creating a recipe linked to the user's tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Dessert')
+        ingredient = Ingredient.objects.create(user=self.user, name='Sugar')
+        payload = {
+            'title': 'Cheesecake',
+            'tags': [tag.id],
+            'ingredients': [ingredient.id],
+            'time_minutes': 60,
+            'price': '20.00',
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_create_recipe_rejects_other_users_tags(self):
+        """Test a recipe can't link tags owned by someone else"""
+        other = get_user_model().objects.create_user(
+            'other@tesla.com', 'testpass'
+        )
+        tag = Tag.objects.create(user=other, name='Vegan')
+        payload = {
+            'title': 'Salad', 'tags': [tag.id], 'ingredients': [],
+            'time_minutes': 5, 'price': '3.00',
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_partial_update_recipe(self):
+        """Test updating a recipe with patch"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        tag = Tag.objects.create(user=self.user, name='Curry')
+
+        res = self.client.patch(
+            detail_url(recipe.id), {'title': 'Chicken tikka', 'tags': [tag.id]}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Chicken tikka')
+        self.assertEqual(list(recipe.tags.all()), [tag])
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes costs the same queries at any page size"""
+        tags = [Tag.objects.create(user=self.user, name='Tag %d' % i)
+                for i in range(3)]
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        counts = []
+
+        for total in (10, 100, 1000):
+            Recipe.objects.filter(user=self.user).delete()
+            recipes = Recipe.objects.bulk_create(
+                Recipe(user=self.user, title='Recipe %d' % i,
+                       time_minutes=i, price=Decimal('1.00'))
+                for i in range(total)
+            )
+            if recipes[0].pk is None:
+                recipes = list(Recipe.objects.filter(user=self.user))
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe in recipes for tag in tags
+            )
+            Recipe.ingredients.through.objects.bulk_create(
+                Recipe.ingredients.through(
+                    recipe_id=recipe.id, ingredient_id=ingredient.id
+                )
+                for recipe in recipes
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(RECIPES_URL, {'page_size': total})
+
+            self.assertEqual(len(res.data['results']), total)
+            self.assertEqual(len(res.data['results'][0]['tags']), 3)
+            counts.append(len(queries))
+
+        self.assertEqual(counts, [4, 4, 4])
+
+
+class CookableRecipeApiTests(TestCase):
+    """Test ranking recipes by the ingredients in a pantry"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'cook@tesla.com', 'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def ingredients(self, *names):
+        return [Ingredient.objects.create(user=self.user, name=name)
+                for name in names]
+
+    def test_cookable_ranked_by_missing(self):
+        """Test recipes lacking fewer ingredients rank first"""
+        salt, egg, flour, milk = self.ingredients(
+            'Salt', 'Egg', 'Flour', 'Milk'
+        )
+        omelette = sample_recipe(self.user, title='Omelette')
+        omelette.ingredients.add(salt, egg)
+        pancakes = sample_recipe(self.user, title='Pancakes')
+        pancakes.ingredients.add(egg, flour, milk)
+        sample_recipe(self.user, title='Toast').ingredients.add(flour)
+
+        res = self.client.get(COOKABLE_URL, {
+            'ingredients': '%d,%d' % (salt.id, egg.id), 'names': 'milk'
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['title'], r['matched'], r['missing']) for r in res.data],
+            [('Omelette', 2, 0), ('Pancakes', 2, 1)]
+        )
+
+    def test_cookable_max_missing(self):
+        """Test max_missing drops recipes lacking too much"""
+        egg, flour, milk = self.ingredients('Egg', 'Flour', 'Milk')
+        sample_recipe(self.user).ingredients.add(egg, flour, milk)
+
+        res = self.client.get(
+            COOKABLE_URL, {'ingredients': egg.id, 'max_missing': 1}
+        )
+
+        self.assertEqual(res.data, [])
+
+    def test_cookable_invalid_ids(self):
+        """Test a malformed ingredient list is rejected"""
+        res = self.client.get(COOKABLE_URL, {'ingredients': '1,salt'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cookable_matches_brute_force(self):
+        """Test ranking agrees with a brute force scan on random data"""
+        rng = random.Random(1234)
+        pantry_items = self.ingredients(*('Item %d' % i for i in range(12)))
+        recipes = [sample_recipe(self.user, title='Recipe %d' % i)
+                   for i in range(60)]
+        for recipe in recipes:
+            recipe.ingredients.set(rng.sample(pantry_items, rng.randint(0, 6)))
+        # Exercise every path that changes links after the initial set.
+        for _ in range(40):
+            recipe = rng.choice(recipes)
+            item = rng.choice(pantry_items)
+            op = rng.choice(('add', 'remove', 'reverse_add', 'clear'))
+            if op == 'add':
+                recipe.ingredients.add(item)
+            elif op == 'remove':
+                recipe.ingredients.remove(item)
+            elif op == 'reverse_add':
+                item.recipe_set.add(recipe)
+            elif rng.random() < 0.2:
+                recipe.ingredients.clear()
+        pantry_items[0].recipe_set.clear()
+        pantry_items.pop().delete()
+
+        links = {
+            recipe.id: {i.id for i in recipe.ingredients.all()}
+            for recipe in Recipe.objects.all()
+        }
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.ingredient_count, len(links[recipe.id]))
+
+        for _ in range(25):
+            pantry = {i.id for i in rng.sample(
+                pantry_items, rng.randint(1, len(pantry_items))
+            )}
+            expected = sorted(
+                (len(needed - pantry), -len(needed & pantry), pk)
+                for pk, needed in links.items() if needed & pantry
+            )
+
+            res = self.client.get(COOKABLE_URL, {
+                'ingredients': ','.join(map(str, pantry)), 'limit': 1000
+            })
+
+            self.assertEqual(
+                [(r['missing'], -r['matched'], r['id']) for r in res.data],
+                expected
+            )
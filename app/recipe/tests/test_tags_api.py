@@ -1,8 +1,15 @@
+import base64
+import json
+
 from django.urls import reverse
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
+from core.models import Recipe
 from recipe.services import TagSerializer, Tag
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -94,3 +101,246 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_tags_paginated(self):
+        """Test walking the tag list with a cursor returns every tag once"""
+        for name in ['Vegan', 'Hot', 'Sweet', 'Hot Pot', 'Dessert']:
+            Tag.objects.create(user=self.user, name=name)
+
+        names = []
+        url = TAGS_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            names.extend(tag['name'] for tag in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(
+            names, ['Dessert', 'Hot', 'Hot Pot', 'Sweet', 'Vegan']
+        )
+
+    def test_invalid_cursor(self):
+        """Test a garbage cursor is rejected"""
+        res = self.client.get(TAGS_URL, {'cursor': 'garbage'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_name_pages_seek_on_row_sort_key(self):
+        """Test name ordered pages sort on the row, not the joined name"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(TAGS_URL, {'page_size': 1})
+
+        page = [q['sql'] for q in queries if 'LIMIT' in q['sql']][0]
+        self.assertIn('ORDER BY "core_tag"."sort_name" ASC', page)
+
+    def test_created_tags_listed_in_name_order(self):
+        """Test tags created through the API page in name order"""
+        for name in ['Zeta', 'Alpha', 'Mid']:
+            self.client.post(TAGS_URL, {'name': name})
+        self.client.post(TAGS_URL, [{'name': 'Beta'}], format='json')
+
+        res = self.client.get(TAGS_URL, {'page_size': 3})
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Alpha', 'Beta', 'Mid']
+        )
+        self.assertEqual(
+            list(Tag.objects.order_by('id').values_list(
+                'sort_name', flat=True
+            )),
+            ['Zeta', 'Alpha', 'Mid', 'Beta']
+        )
+
+    def test_cursor_seeks_from_leading_bound(self):
+        """Test a cursor page bounds the leading column before the OR"""
+        for name in ['Vegan', 'Hot']:
+            Tag.objects.create(user=self.user, name=name)
+        first = self.client.get(TAGS_URL, {'page_size': 1})
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(first.data['next'])
+
+        page = [q['sql'] for q in queries if 'LIMIT' in q['sql']][0]
+        self.assertIn('"core_tag"."sort_name" >= \'Hot\' AND (', page)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ['Vegan']
+        )
+
+    def test_cursor_with_wrong_value_types(self):
+        """Test well formed cursors holding bad values are rejected too"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        for position in (['x', 'abc'], ['Vegan', {'a': 1}],
+                         ['Vegan', [1]], [None, 1]):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(position).encode()
+            ).decode()
+
+            res = self.client.get(TAGS_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_create_tags(self):
+        """Test a JSON array creates every tag in one request"""
+        payload = [{'name': 'Vegan'}, {'name': 'Hot'}, {'name': 'Vegan'}]
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        self.assertTrue(all(tag['id'] for tag in res.data))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_create_existing_tag_ignores_case(self):
+        """Test posting an existing name in another case returns it"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'VEGAN'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], tag.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_tags_reuses_existing(self):
+        """Test a batch returns existing tags and folds case variants"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'vegan'}, {'name': 'Hot'}, {'name': 'HOT'}]
+
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(t['id'] == tag.id, t['name']) for t in res.data],
+            [(True, 'Vegan'), (False, 'Hot')]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_tags_invalid_item(self):
+        """Test one invalid item rejects the batch with per item errors"""
+        payload = [{'name': 'Vegan'}, {'name': ''}]
+        res = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_list_bytes_match_serializer(self):
+        """Test the fast list path renders exactly what the serializer does"""
+        for name in ['Vegan', 'Caf\u00e9', 'Hot \u2028 line']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, HTTP_ACCEPT='application/json')
+
+        tags = Tag.objects.filter(user=self.user).order_by('name', 'id')
+        expected = JSONRenderer().render(TagSerializer(tags, many=True).data)
+        self.assertEqual(res.content, expected)
+
+    def test_stream_list_matches_list(self):
+        """Test ?stream=1 streams the same document as the plain list"""
+        for name in ['Vegan', 'Caf\u00e9', 'Hot \u2028 line']:
+            Tag.objects.create(user=self.user, name=name)
+
+        plain = self.client.get(TAGS_URL, {'ordering': '-usage'})
+        res = self.client.get(TAGS_URL, {'ordering': '-usage', 'stream': 1})
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(b''.join(res.streaming_content), plain.content)
+
+    def test_search_tags_paginated(self):
+        """Test search composes with cursor pagination"""
+        for name in ['Hot', 'Hot Pot', 'Vegan', 'Red Hot']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'search': 'hot', 'page_size': 2})
+        rest = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [t['name'] for t in res.data['results'] + rest.data['results']],
+            ['Hot', 'Hot Pot', 'Red Hot']
+        )
+
+    def test_order_tags_by_usage(self):
+        """Test ?ordering=-usage pages through the most used tags first"""
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ['Vegan', 'Hot', 'Sweet']]
+        for uses, tag in zip([1, 3, 0], tags):
+            for _ in range(uses):
+                Recipe.objects.create(
+                    user=self.user, title='Dish', time_minutes=1, price=1
+                ).tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'ordering': '-usage', 'page_size': 2})
+        rest = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            res.data['results'] + rest.data['results'],
+            [{'id': tags[1].id, 'name': 'Hot'},
+             {'id': tags[0].id, 'name': 'Vegan'},
+             {'id': tags[2].id, 'name': 'Sweet'}]
+        )
+
+    def test_unknown_ordering(self):
+        """Test an unsupported ordering is rejected"""
+        res = self.client.get(TAGS_URL, {'ordering': 'name'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_conditional_get_not_modified(self):
+        """Test a matching If-None-Match costs one lookup and returns 304"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(
+                TAGS_URL, HTTP_IF_NONE_MATCH=res['ETag']
+            )
+
+        self.assertIn('Last-Modified', res)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached['ETag'], res['ETag'])
+        self.assertEqual(cached.content, b'')
+
+    def test_etag_changes_with_tags_and_usage(self):
+        """Test renaming a tag or linking it to a recipe changes the ETag"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etags = [self.client.get(TAGS_URL)['ETag']]
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        etags.append(self.client.get(TAGS_URL)['ETag'])
+        Recipe.objects.create(
+            user=self.user, title='Salad', time_minutes=5, price=1
+        ).tags.add(tag)
+        etags.append(self.client.get(TAGS_URL)['ETag'])
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etags[0])
+
+        self.assertEqual(len(set(etags)), 3)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_varies_with_query(self):
+        """Test each query string gets its own validator"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+        filtered = self.client.get(TAGS_URL, {'search': 'veg'})
+
+        self.assertNotEqual(res['ETag'], filtered['ETag'])
+
+    def test_list_served_from_cache_until_write(self):
+        """Test a repeated list skips the rows until the user writes"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Hot'})
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(
+            [t['name'] for t in json.loads(cached.content)], ['Vegan']
+        )
+        self.assertEqual([t['name'] for t in res.data], ['Hot', 'Vegan'])
@@ -7,9 +7,10 @@ app_name = 'recipe'
 router = DefaultRouter()
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
-
+router.register('recipes', views.RecipeViewSet)
 
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('export/', views.ExportView.as_view(), name='export'),
 ]
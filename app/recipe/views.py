@@ -1,41 +1,338 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
+from rest_framework.views import APIView
 
-from core.models import Tag, Ingredient
+from core import export
+from core.authentication import SignedTokenAuthentication
+from core.cache import list_cache
+from core.conditional import make_etag, not_modified, set_validators, \
+    timestamp
+from core.models import CollectionVersion, Tag, Ingredient, Recipe
+from core.pagination import KeysetPagination
+from core.renderers import StreamingJSONRenderer
 from recipe import services
+from recipe.filters import NameFilter
 
 
-class TagViewSet(viewsets.GenericViewSet,
-                 mixins.ListModelMixin,
-                 mixins.CreateModelMixin):
-    authentication_classes = (TokenAuthentication,)
+class VersionedListMixin:
+    """List action validated and cached by the user's collection versions
+
+    Every write to a listed collection bumps its CollectionVersion in the
+    same transaction (core.signals, or the bulk paths themselves), so the
+    versions of `version_kinds` identify the list's content. They give
+    the response a strong ETag and Last-Modified, answer a matching
+    If-None-Match with 304 before any row is read, and key the rendered
+    JSON in the shared list cache. A user's own write therefore always
+    moves their next request to a fresh key.
+    """
+    version_kinds = ()
+
+    def list(self, request, *args, **kwargs):
+        # The versions are read before the rows, so a concurrent write can
+        # only pair newer rows with an older key, never the reverse.
+        versions = CollectionVersion.objects.current(
+            request.user, self.version_kinds
+        )
+        etag = make_etag(
+            request.user.pk, self.version_kinds, versions,
+            request.accepted_media_type, request.build_absolute_uri()
+        )
+        modified = timestamp(max(
+            (updated_at for _, updated_at in versions if updated_at),
+            default=None
+        ))
+        response = not_modified(request, etag, modified)
+        if response is not None:
+            return response
+
+        if not self.is_cacheable(request):
+            response = self.list_response(request, *args, **kwargs)
+            return set_validators(response, etag, modified)
+
+        rendered = []
+
+        def render():
+            response = self.finalize_response(
+                request, self.list_response(request, *args, **kwargs),
+                *args, **kwargs
+            )
+            rendered.append(response.render())
+            return (response.status_code, response['Content-Type'],
+                    response.content)
+
+        status_code, content_type, content = list_cache.get_or_render(
+            etag.strip('"'), render
+        )
+        if rendered:
+            response = rendered[0]
+        else:
+            response = HttpResponse(
+                content, content_type=content_type, status=status_code
+            )
+        return set_validators(response, etag, modified)
+
+    def is_cacheable(self, request):
+        """Only JSON is cached; the browsable API embeds per-request data"""
+        return request.accepted_renderer.format == 'json'
+
+    def list_response(self, request, *args, **kwargs):
+        """Build the list response when neither 304 nor cache applies"""
+        return super().list(request, *args, **kwargs)
+
+
+class BaseRecipeAttrViewSet(VersionedListMixin, viewsets.GenericViewSet,
+                            mixins.ListModelMixin,
+                            mixins.CreateModelMixin):
+    """Base viewset for the user owned recipe attributes"""
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-    serializer_class = services.TagSerializer
-    queryset = Tag.objects.all()
+    pagination_class = KeysetPagination
+    filter_backends = (NameFilter,)
+    stream_chunk_size = 2000
+    orderings = {
+        'usage': ('usage_count', 'id'),
+        '-usage': ('-usage_count', '-id'),
+    }
+
+    def initial(self, request, *args, **kwargs):
+        """Switch to an alternative keyset ordering given by `?ordering=`"""
+        super().initial(request, *args, **kwargs)
+        ordering = request.query_params.get('ordering')
+        if ordering:
+            if ordering not in self.orderings:
+                raise ValidationError({'ordering': [
+                    _('Expected one of: %s.') % ', '.join(self.orderings)
+                ]})
+            self.keyset_ordering = self.orderings[ordering]
+
+    def is_cacheable(self, request):
+        return super().is_cacheable(request) and \
+            request.query_params.get('stream') not in ('1', 'true')
 
     def get_queryset(self):
-        """"Returns objects for the authenticated users only"""
-        return self.queryset.filter(user=self.request.user).order_by('name')
+        """Return objects for the current authenticated user only"""
+        return self.queryset.filter(
+            user=self.request.user
+        ).order_by(*self.keyset_ordering)
+
+    def list_response(self, request, *args, **kwargs):
+        """List rows as plain dicts, skipping model and serializer setup
+
+        The list serializers are flat `fields` over model columns, so the
+        values() rows are exactly what they would produce. Ordering columns
+        outside those fields are read for the cursor, then dropped.
+
+        `?stream=1` returns the whole list as a streamed JSON array instead,
+        encoded chunk by chunk from a server-side cursor; pagination
+        parameters are ignored in that mode, and so is the list cache.
+        """
+        fields = self.get_serializer_class().Meta.fields
+        extra = [
+            field.lstrip('-') for field in self.keyset_ordering
+            if field.lstrip('-') not in fields
+        ]
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *fields, *extra
+        )
+
+        if request.query_params.get('stream') in ('1', 'true'):
+            rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+            if extra:
+                rows = ({field: row[field] for field in fields}
+                        for row in rows)
+            return StreamingHttpResponse(
+                StreamingJSONRenderer().iter_render(rows),
+                content_type=StreamingJSONRenderer.media_type
+            )
+
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        if extra:
+            rows = [{field: row[field] for field in fields} for row in rows]
+
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
+
+    def create(self, request, *args, **kwargs):
+        """Create one object, or many at once when given a JSON array
+
+        Names are unique per user ignoring case; posting a name that
+        already exists returns the existing object with 200.
+        """
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        created = self.perform_create(serializer)
+
+        if many or created:
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def perform_create(self, serializer):
-        """Create a new ingredient"""
-        serializer.save(user=self.request.user)
+        """Get or create the object for the authenticated user
 
+        Returns whether a new row was inserted.
+        """
+        if isinstance(serializer, ListSerializer):
+            serializer.save(user=self.request.user)
+            return True
 
-class IngredientViewSet(viewsets.GenericViewSet,
-                        mixins.ListModelMixin,
-                        mixins.CreateModelMixin):
+        serializer.instance, created = \
+            self.queryset.model.objects.get_or_create_by_name(
+                self.request.user, serializer.validated_data['name']
+            )
+        return created
+
+
+class TagViewSet(BaseRecipeAttrViewSet):
+    """Manage tags in the database"""
+    serializer_class = services.TagSerializer
+    queryset = Tag.objects.all()
+    version_kinds = ('tag',)
+    keyset_ordering = ('sort_name', 'id')
+
+
+class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
-    authentication_classes = (TokenAuthentication,)
-    permission_classes = (IsAuthenticated,)
     queryset = Ingredient.objects.all()
     serializer_class = services.IngredientSerializer
+    version_kinds = ('ingredient',)
+    keyset_ordering = ('-sort_name', '-id')
+
+
+def names_only(model):
+    """Queryset loading just the id and name of tags or ingredients"""
+    return model.objects.only('id').order_by('sort_name', 'id')
+
+
+class RecipeViewSet(VersionedListMixin, viewsets.ModelViewSet):
+    """Manage recipes in the database
+
+    Lists and details prefetch tags and ingredients with one query each,
+    so a page costs the same number of queries whatever its size. Lists
+    embed tag and ingredient names, so they are versioned by all three
+    collections.
+    """
+    queryset = Recipe.objects.all()
+    version_kinds = ('recipe', 'tag', 'ingredient')
+    serializer_class = services.RecipeSerializer
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-id',)
 
     def get_queryset(self):
-        """Return objects for the current authenticated user only"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        """Return recipes for the current authenticated user only"""
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).order_by(*self.keyset_ordering)
+        if self.action in ('list', 'retrieve', 'cookable'):
+            queryset = queryset.prefetch_related(
+                Prefetch('tags', queryset=names_only(Tag)),
+                Prefetch('ingredients', queryset=names_only(Ingredient)),
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return services.RecipeListSerializer
+        if self.action == 'cookable':
+            return services.CookableRecipeSerializer
+        if self.action == 'retrieve':
+            return services.RecipeDetailSerializer
+        return self.serializer_class
 
     def perform_create(self, serializer):
-        """Create a new ingredient"""
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        """Create a new recipe owned by the authenticated user"""
+        serializer.save(user=self.request.user)
+
+    @action(detail=False)
+    def cookable(self, request):
+        """Rank recipes by how many of their ingredients the pantry lacks
+
+        The pantry is given as `?ingredients=` (comma separated ids) and/or
+        `?names=` (comma separated names). Only recipes using at least one
+        pantry ingredient are returned; `?max_missing=` drops those lacking
+        more and `?limit=` caps the result size.
+        """
+        params = request.query_params
+        pantry = set(int_list(params, 'ingredients'))
+        names = [n.strip().lower() for n in params.get('names', '').split(',')]
+        if any(names):
+            pantry.update(Ingredient.objects.filter(
+                user=request.user, name_key__text__in=names
+            ).values_list('id', flat=True))
+
+        limit = int_param(params, 'limit', 50, maximum=1000)
+        max_missing = int_param(params, 'max_missing', None)
+        ranked = list(Recipe.objects.cookable(
+            request.user, pantry, max_missing
+        )[:limit]) if pantry else []
+
+        recipes = self.get_queryset().in_bulk(
+            [row['recipe_id'] for row in ranked]
+        )
+        results = []
+        for row in ranked:
+            recipe = recipes[row['recipe_id']]
+            recipe.matched = row['matched']
+            recipe.missing = row['missing']
+            results.append(recipe)
+        return Response(self.get_serializer(results, many=True).data)
+
+
+def int_list(params, name):
+    """Parse a comma separated list of ids from the query string"""
+    value = params.get(name, '')
+    try:
+        return [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        raise ValidationError({name: [_('Expected comma separated ids.')]})
+
+
+def int_param(params, name, default, maximum=None):
+    """Parse a non-negative integer query parameter"""
+    if name not in params:
+        return default
+    try:
+        value = int(params[name])
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise ValidationError({name: [_('Expected a non-negative integer.')]})
+    return value if maximum is None else min(value, maximum)
+
+
+class ExportView(APIView):
+    """Stream the authenticated user's tags and ingredients as NDJSON
+
+    `?gzip=1` compresses on the fly and `?after=<kind>:<id>` resumes an
+    interrupted export from the last line received.
+    """
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        after = request.query_params.get('after')
+        if after:
+            try:
+                after = export.parse_resume_token(after)
+            except ValueError:
+                raise ValidationError({'after': [_('Invalid resume token')]})
+
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        response = StreamingHttpResponse(
+            export.export_stream(request.user, after, compress),
+            content_type='application/x-ndjson'
+        )
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
@@ -1,16 +1,44 @@
+from contextlib import contextmanager, nullcontext
+
 from django.contrib.auth import get_user_model, authenticate
+from django.db import IntegrityError, transaction
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
 
+@contextmanager
+def unique_email():
+    """Report a duplicate email from the unique index as a field error
+
+    The message is the one DRF's UniqueValidator would have produced.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError:
+        model = get_user_model()
+        field = model._meta.get_field('email')
+        raise serializers.ValidationError({'email': [
+            field.error_messages['unique'] % {
+                'model_name': model._meta.verbose_name,
+                'field_label': field.verbose_name,
+            }
+        ]}, code='unique')
+
+
 class UserSerializer(serializers.ModelSerializer):
-    """A User Create service"""
+    """A User Create service
+
+    Email uniqueness is left to the database: there is no SELECT before
+    the write, and a conflict is mapped to the usual validation error.
+    """
 
     class Meta:
         """Define model to be serialized and put any conditions here"""
         model = get_user_model()
         fields = ('email', 'name', 'password')
         extra_kwargs = {
+            'email': {'validators': []},
             'password': {
                 'write_only': True,
                 'min_length': 5,
@@ -20,18 +48,27 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """create new user with encrypted password and then return it"""
-        return get_user_model().objects.create_user(**validated_data)
+        with unique_email():
+            return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        """Update the user, set the password correclty and return it"""
+        """Update the user, set the password correclty and return it
+
+        Everything, password included, goes out in a single save(), which
+        only writes the changed columns.
+        """
         password = validated_data.pop("password", None)
-        user = super().update(instance=instance, validated_data=validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
 
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+        # Only an email change can conflict; other updates skip the
+        # savepoint and stay a single statement.
+        with unique_email() if 'email' in validated_data else nullcontext():
+            instance.save()
 
-        return user
+        return instance
 
 
 class AuthTokenSerializer(serializers.Serializer):
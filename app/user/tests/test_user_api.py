@@ -1,12 +1,17 @@
 from django.urls import reverse
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
 #
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
+SIGNED_TOKEN_URL = reverse('user:token-signed')
 ME_URL = reverse('user:me')
 
 
@@ -61,6 +66,46 @@ class PublicUserApiTests(TestCase):
 
         self.assertEquals(res2.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_user_without_lookup(self):
+        """Test signup inserts without a SELECT and reports duplicates"""
+        payload = {
+            'email': 'test@tessel.tech',
+            'name': 'tester guy',
+            'password': 'ssshhh123'
+        }
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(CREATE_USER_URL, payload)
+        duplicate = self.client.post(CREATE_USER_URL, dict(
+            payload, email='Test@tessel.tech'
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(
+            [q for q in queries if q['sql'].startswith('SELECT')]
+        )
+        self.assertEqual(duplicate.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            duplicate.data['email'], ['user with this email already exists.']
+        )
+
+    def test_create_user_with_token(self):
+        """Test ?token=1 returns a working auth token with the new user"""
+        payload = {
+            'email': 'test@tessel.tech',
+            'name': 'tester guy',
+            'password': 'ssshhh123'
+        }
+        res = self.client.post(CREATE_USER_URL + '?token=1', payload)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + res.data['token']
+        )
+        me = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(me.status_code, status.HTTP_200_OK)
+        self.assertEqual(me.data['email'], payload['email'])
+
     def test_token_generated_valid_user(self):
         """"Test if token generated for user login"""
         payload = {
@@ -72,6 +117,29 @@ class PublicUserApiTests(TestCase):
         self.assertEquals(res.status_code, status.HTTP_200_OK)
         self.assertIn('token', res.data)
 
+    def test_signed_token_generated_valid_user(self):
+        """Test a signed token can be obtained with valid credentials"""
+        payload = {
+            'email': 'test@tessel.tech',
+            'password': 'ssshhh123'
+        }
+        create_user(**payload)
+        res = self.client.post(SIGNED_TOKEN_URL, payload)
+        self.assertEquals(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['token'].startswith('s1.'))
+        self.assertIn('expires_in', res.data)
+
+    def test_token_for_email_in_other_case(self):
+        """Test logging in works whatever the letter case of the email"""
+        create_user(email='test@tessel.tech', password='ssshhh123')
+
+        res = self.client.post(
+            TOKEN_URL, {'email': 'Test@Tessel.TECH', 'password': 'ssshhh123'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('token', res.data)
+
     def test_token_not_generated_invalid_user(self):
         """"Test if token generated for user login"""
         valid_user = {
@@ -161,3 +229,76 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, update_payload["name"])
         self.assertTrue(self.user.check_password(update_payload["password"]))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_profile_single_update(self):
+        """Test a profile change with a password is one narrow UPDATE"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(
+                ME_URL, {'name': 'renamed', 'password': 'newpass123'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(queries[0]['sql'].startswith('SELECT'))
+        sql = queries[1]['sql']
+        self.assertTrue(sql.startswith('UPDATE'))
+        for column in ('name', 'password', 'token_version', 'updated_at'):
+            self.assertIn('"%s"' % column, sql)
+        self.assertNotIn('"email"', sql)
+
+    def test_update_profile_with_cached_token(self):
+        """Test a PATCH through the token cache keeps newer column values"""
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            token_version=5
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            res = client.patch(ME_URL, {'name': 'renamed'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        update = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(update), 1)
+        self.assertNotIn('"token_version"', update[0])
+        self.assertNotIn('"is_active"', update[0])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'renamed')
+        self.assertEqual(self.user.token_version, 5)
+
+    def test_update_email_taken(self):
+        """Test changing to another user's email is a validation error"""
+        create_user(email='other@tessel.tech', password='ssshhh123')
+
+        res = self.client.patch(ME_URL, {'email': 'other@tessel.tech'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', res.data)
+
+    def test_retrieve_profile_not_modified(self):
+        """Test /me answers a matching If-None-Match with one query"""
+        res = self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.client.patch(ME_URL, {'name': 'renamed'})
+        changed = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(changed.data['name'], 'renamed')
+
+    def test_retrieve_profile_changed_elsewhere(self):
+        """Test /me validators follow the database, not a cached user"""
+        res = self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            name='renamed', updated_at=timezone.now()
+        )
+
+        changed = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(changed.data['name'], 'renamed')
+        self.assertNotEqual(changed['ETag'], res['ETag'])
@@ -1,13 +1,41 @@
+from django.conf import settings
+from django.db import transaction
+
 from .services import UserSerializer, AuthTokenSerializer
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.settings import api_settings
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
+
+from core.authentication import SignedTokenAuthentication
+from core.conditional import make_etag, not_modified, set_validators, \
+    timestamp
+from core.tokens import make_signed_token
 
 
 class CreateUserView(generics.CreateAPIView):
-    """API to create new user in the system"""
+    """API to create new user in the system
+
+    With `?token=1` the response also carries an auth token, as
+    user/token/ would return, so signing up does not need a second
+    request and a second password hash.
+    """
     serializer_class = UserSerializer
 
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            self.perform_create(serializer)
+            data = serializer.data
+            if request.query_params.get('token') in ('1', 'true'):
+                data['token'] = Token.objects.create(
+                    user=serializer.instance
+                ).key
+        headers = self.get_success_headers(data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
 
 class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for the user"""
@@ -15,12 +43,58 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
+class CreateSignedTokenView(CreateTokenView):
+    """Create a stateless signed access token for the user"""
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data,
+                                           context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response({
+            'token': make_signed_token(user),
+            'expires_in': settings.SIGNED_TOKEN['LIFETIME'],
+        })
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        """Retrieve an authenticated user"""
-        return self.request.user
+        """Retrieve an authenticated user
+
+        Updates load the row by primary key rather than trusting the
+        cached user from authentication, so save() writes only the fields
+        the request changed on top of current values.
+        """
+        user = self.request.user
+        if self.request.method in ('PUT', 'PATCH'):
+            user = type(user)._default_manager.get(pk=user.pk)
+        return user
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the user, or 304 when the client's copy is current
+
+        The authenticated user may be a per worker cached copy, so the
+        validators come from updated_at read by primary key; a user that
+        changed elsewhere is reloaded before it is serialized.
+        """
+        user = self.get_object()
+        updated_at = type(user)._default_manager.filter(
+            pk=user.pk
+        ).values_list('updated_at', flat=True).first()
+        if updated_at != user.updated_at:
+            user.refresh_from_db()
+        etag = make_etag(
+            user.pk, user.updated_at.isoformat(), request.accepted_media_type
+        )
+        modified = timestamp(user.updated_at)
+        response = not_modified(request, etag, modified)
+        if response is not None:
+            return response
+        return set_validators(
+            super().retrieve(request, *args, **kwargs), etag, modified
+        )